@@ -1,19 +1,64 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from ..models.schemas import SessionRequest
-from ..services.openai_service import create_openai_session
+from ..services.token_pool import session_token_pool
+from ..services.doctor_cache import doctor_cache
+from ..services.doctor_search import doctor_search_index
+from ..services.query_profiler import endpoint_query_stats
+from ..services.rate_limits import client_key, session_rate_limiter
+from ..services.readiness import readiness
+from ..services.session_registry import session_registry
+from ..services.telemetry import metrics_payload
+from ..services.tools import get_tool_stats
 
 router = APIRouter()
 
 @router.post("/api/sessions")
-async def create_session(session_request: SessionRequest):
+async def create_session(session_request: SessionRequest, request: Request):
     """Create an ephemeral session token for WebRTC client use"""
-    return await create_openai_session(
+    if not await session_rate_limiter.allow(client_key(request)):
+        raise HTTPException(status_code=429, detail="Too many sessions, try again later")
+    return await session_token_pool.acquire(
         session_request.model, 
         session_request.voice,
         session_request.system_prompt
     )
 
-# Add a simple health check endpoint
+# Add a simple health check endpoint (liveness: answers as soon as the worker is up)
 @router.get("/api/health")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok", "voice_sessions": len(session_registry)}
+
+# Readiness: 503 until Mongo, indexes and the search index are up, and again while draining
+@router.get("/api/ready")
+async def ready_check():
+    checks = dict(readiness.checks)
+    if session_registry.draining:
+        return JSONResponse({"status": "draining", "checks": checks}, status_code=503)
+    if not readiness.ready:
+        return JSONResponse({"status": "starting", "checks": checks}, status_code=503)
+    return {"status": "ready", "checks": checks}
+
+# Per-tool latency and error counters for the voice agent
+@router.get("/api/tools/stats")
+async def tool_stats():
+    return get_tool_stats()
+
+# Doctor cache hit/miss counters and search index size
+@router.get("/api/cache/stats")
+async def cache_stats():
+    return {"doctors": doctor_cache.stats(), "doctor_search": doctor_search_index.stats()}
+
+# Mongo round trips per route and tool, to catch endpoints that grow extra queries
+@router.get("/api/queries/stats")
+async def query_stats():
+    return endpoint_query_stats.snapshot()
+
+# Prometheus scrape endpoint: voice session, tool and Mongo latency histograms
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    payload = metrics_payload()
+    if payload is None:
+        return Response("prometheus_client is not installed\n", status_code=503, media_type="text/plain")
+    content, content_type = payload
+    return Response(content, media_type=content_type)
@@ -1,18 +1,31 @@
 from fastapi import WebSocket
 from ..services.openai_service import connect_to_openai_websocket
+from ..services.rate_limits import client_key, session_rate_limiter
+from ..services.session_registry import session_registry
 
 async def websocket_proxy_handler(websocket: WebSocket):
     """Proxy WebSocket connections to the OpenAI Realtime API"""
     await websocket.accept()
     
+    # Shutting down or over the per-client limit: tell the client to retry elsewhere/later
+    if not await session_rate_limiter.allow(client_key(websocket)):
+        await websocket.close(code=1013, reason="Too many sessions, try again later")
+        return
+    if not session_registry.add(websocket):
+        await websocket.close(code=1012, reason="Server restarting")
+        return
+    
     try:
         # Get configuration from the client
         config = await websocket.receive_json()
         model = config.get("model", "gpt-4o-realtime-preview-2024-12-17")
         system_prompt = config.get("system_prompt")
+        binary_audio = bool(config.get("binary_audio", False))
         
         # Connect to OpenAI Realtime API
-        await connect_to_openai_websocket(websocket, model, system_prompt)
+        await connect_to_openai_websocket(websocket, model, system_prompt, binary_audio=binary_audio)
         
     except Exception as e:
-        await websocket.close(code=1011, reason=f"Error: {str(e)}")
\ No newline at end of file
+        await websocket.close(code=1011, reason=f"Error: {str(e)}")
+    finally:
+        session_registry.discard(websocket)
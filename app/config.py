@@ -7,7 +7,8 @@ load_dotenv()
 # Get API key from environment
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
+    # Not fatal at import: CLIs and the CRUD API work without it, and /api/ready reports it
+    print("[Config] OPENAI_API_KEY environment variable is not set; voice sessions will fail")
 
 # System prompts
 ARABIC_SYSTEM_PROMPT = """
@@ -50,3 +51,116 @@ ARABIC_SYSTEM_PROMPT = """
 # database connection
 DATABASE_NAME=os.getenv("DATABASE_NAME")
 DATABASE_HOST=os.getenv("DATABASE_HOST")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+# keep a few warm connections so the first queries after idle skip the handshake
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+# fail fast instead of pymongo's 30s default when the server is unreachable
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+# startup waits this long between Mongo pings before reporting ready
+READY_RETRY_INTERVAL = float(os.getenv("READY_RETRY_INTERVAL", "2"))
+
+# tool calls (per voice session)
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "4"))
+TOOL_QUEUE_SIZE = int(os.getenv("TOOL_QUEUE_SIZE", "16"))
+TOOL_RESULTS_ORDERED = os.getenv("TOOL_RESULTS_ORDERED", "false").lower() == "true"
+TOOL_TIMEOUTS = {
+    "default": float(os.getenv("TOOL_TIMEOUT_SECONDS", "5")),
+    "search_doctor_by_name": float(os.getenv("TOOL_TIMEOUT_SEARCH_SECONDS", "3")),
+    "get_doctor_availability": float(os.getenv("TOOL_TIMEOUT_AVAILABILITY_SECONDS", "5")),
+    "book_appointment": float(os.getenv("TOOL_TIMEOUT_BOOKING_SECONDS", "8")),
+}
+
+# upstream OpenAI HTTP client (shared, pooled)
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() == "true"
+OPENAI_HTTP_MAX_CONNECTIONS = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100"))
+OPENAI_HTTP_MAX_KEEPALIVE = int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "20"))
+OPENAI_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY", "30"))
+OPENAI_HTTP_CONNECT_TIMEOUT = float(os.getenv("OPENAI_HTTP_CONNECT_TIMEOUT", "5"))
+OPENAI_HTTP_READ_TIMEOUT = float(os.getenv("OPENAI_HTTP_READ_TIMEOUT", "15"))
+OPENAI_HTTP_RETRIES = int(os.getenv("OPENAI_HTTP_RETRIES", "3"))
+OPENAI_HTTP_RETRY_BACKOFF = float(os.getenv("OPENAI_HTTP_RETRY_BACKOFF", "0.25"))
+
+# pre-minted ephemeral session tokens for /api/sessions (TOKEN_POOL_SIZE=0 disables)
+TOKEN_POOL_SIZE = int(os.getenv("TOKEN_POOL_SIZE", "2"))
+TOKEN_POOL_MIN_TTL = float(os.getenv("TOKEN_POOL_MIN_TTL", "20"))
+TOKEN_POOL_REFILL_INTERVAL = float(os.getenv("TOKEN_POOL_REFILL_INTERVAL", "5"))
+TOKEN_POOL_MAX_KEYS = int(os.getenv("TOKEN_POOL_MAX_KEYS", "8"))
+# stop refilling a key nobody has acquired for this many seconds
+TOKEN_POOL_IDLE_TIMEOUT = float(os.getenv("TOKEN_POOL_IDLE_TIMEOUT", "600"))
+
+# per-session WebSocket proxy buffers (in frames)
+CLIENT_BUFFER_HIGH_WATERMARK = int(os.getenv("CLIENT_BUFFER_HIGH_WATERMARK", "256"))
+CLIENT_BUFFER_LOW_WATERMARK = int(os.getenv("CLIENT_BUFFER_LOW_WATERMARK", "64"))
+UPSTREAM_BUFFER_HIGH_WATERMARK = int(os.getenv("UPSTREAM_BUFFER_HIGH_WATERMARK", "128"))
+UPSTREAM_BUFFER_LOW_WATERMARK = int(os.getenv("UPSTREAM_BUFFER_LOW_WATERMARK", "32"))
+# Upstream event types that may be discarded (oldest first) when the client falls behind
+CLIENT_DROPPABLE_EVENT_TYPES = frozenset(
+    t.strip() for t in os.getenv("CLIENT_DROPPABLE_EVENT_TYPES", "response.audio.delta").split(",") if t.strip()
+)
+
+# default voice-agent prompt rendered from the doctors collection
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "300"))
+
+# in-process doctor document cache
+DOCTOR_CACHE_SIZE = int(os.getenv("DOCTOR_CACHE_SIZE", "1024"))
+DOCTOR_CACHE_TTL = float(os.getenv("DOCTOR_CACHE_TTL", "300"))
+# cross-worker invalidation: "none", "poll", "change_stream" or "pubsub" (via SHARED_STATE_URL)
+DOCTOR_CACHE_INVALIDATOR = os.getenv("DOCTOR_CACHE_INVALIDATOR", "none")
+DOCTOR_CACHE_POLL_INTERVAL = float(os.getenv("DOCTOR_CACHE_POLL_INTERVAL", "5"))
+# polling backs off after errors, up to this many seconds between attempts
+DOCTOR_CACHE_POLL_MAX_BACKOFF = float(os.getenv("DOCTOR_CACHE_POLL_MAX_BACKOFF", "60"))
+
+# in-process fuzzy doctor name search used by the voice agent
+DOCTOR_SEARCH_LIMIT = int(os.getenv("DOCTOR_SEARCH_LIMIT", "5"))
+DOCTOR_SEARCH_MIN_SCORE = float(os.getenv("DOCTOR_SEARCH_MIN_SCORE", "0.6"))
+# transliteration matches score below exact spellings, so "محمد" ranks above "محمود"
+DOCTOR_SEARCH_SKELETON_WEIGHT = float(os.getenv("DOCTOR_SEARCH_SKELETON_WEIGHT", "0.85"))
+# full reload interval in seconds, for writes that bypass invalidate_doctor (0 disables)
+DOCTOR_SEARCH_TTL = float(os.getenv("DOCTOR_SEARCH_TTL", "300"))
+
+# Mongo query profiling per request/tool call; headers are meant for debugging only
+QUERY_PROFILE_HEADERS = os.getenv("QUERY_PROFILE_HEADERS", "false").lower() == "true"
+QUERY_PROFILE_MAX_COMMANDS = int(os.getenv("QUERY_PROFILE_MAX_COMMANDS", "50"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# also match appointments without start_minute/end_minute in overlap checks (ISO string $or branch).
+# only for the window before python -m app.utils.migrate_times has run; startup runs it too. remove with the branch.
+LEGACY_TIME_FIELDS = os.getenv("LEGACY_TIME_FIELDS", "false").lower() == "true"
+
+# bookable slot size offered by the availability API and the voice agent
+SLOT_DURATION_MINUTES = int(os.getenv("SLOT_DURATION_MINUTES", "30"))
+TOOL_MAX_SLOTS = int(os.getenv("TOOL_MAX_SLOTS", "8"))
+
+# booking reservations: one unique document per doctor/date/bucket of this many minutes.
+# bookings must start and end on a bucket boundary (offered slots are aligned to it), so a
+# 30-minute visit is 6 documents; after changing it, drop the reservations collection and
+# re-run python -m app.utils.migrate_times --reservations
+RESERVATION_GRANULARITY_MINUTES = int(os.getenv("RESERVATION_GRANULARITY_MINUTES", "5"))
+
+# streaming exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))
+
+# NDJSON bulk imports
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+# state shared by all workers (token pool, cache invalidation, rate limits): memory:// or redis://host:6379/0
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "memory://")
+# new voice sessions (/api/sessions + /ws/proxy) per client per window; 0 disables
+SESSION_RATE_LIMIT = int(os.getenv("SESSION_RATE_LIMIT", "0"))
+SESSION_RATE_WINDOW = float(os.getenv("SESSION_RATE_WINDOW", "60"))
+# reverse proxies (IPs or CIDRs, comma separated) whose X-Forwarded-For is believed; empty ignores the header
+TRUSTED_PROXIES = [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+
+# production runner (app/run.py)
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+# more than one worker needs SHARED_STATE_URL=redis://...
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+# seconds open voice sessions get to finish on shutdown before they are closed
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
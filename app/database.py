@@ -1,25 +1,92 @@
-
-from motor.motor_asyncio import AsyncIOMotorClient # type: ignore
 # from app.utils.load_helper import DATABASE_HOST,DATABASE_NAME
-from app.config import DATABASE_HOST,DATABASE_NAME
+from app.config import (
+    DATABASE_HOST,
+    DATABASE_NAME,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+)
+from app.services.query_profiler import QueryProfiler
+from app.services.telemetry import MongoToolTimer
+
+_client = None
+
+
+def get_client():
+    """The shared Motor client, created on first use (normally by the app lifespan)"""
+    global _client
+    if _client is None:
+        # Deferred so importing the app (and worker cold start) does not pay for Motor
+        from motor.motor_asyncio import AsyncIOMotorClient  # type: ignore
+
+        print("Connecting to MongoDB database...")
+        print(f"Host: {DATABASE_HOST}"
+              f"Database: {DATABASE_NAME}")
+        # Create a MongoDB client; connections are opened lazily by the pool
+        _client = AsyncIOMotorClient(
+            DATABASE_HOST,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            event_listeners=[MongoToolTimer(), QueryProfiler()],
+        )
+    return _client
+
+
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class LazyCollection:
+    """Module-level stand-in for a Motor collection, resolved against the current client on use.
+
+    Lets every module keep ``from app.database import doctors_collection``
+    while the client itself is only created by the lifespan (or first query).
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._client = None
+        self._collection = None
+
+    def _resolve(self):
+        client = get_client()
+        if self._client is not client:
+            self._client = client
+            self._collection = client[DATABASE_NAME][self._name]
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self) -> str:
+        return f"LazyCollection({self._name!r})"
 
 
-print("Connecting to MongoDB database...")
-print(f"Host: {DATABASE_HOST}"
-      f"Database: {DATABASE_NAME}")
-# Create a MongoDB client   
-client = AsyncIOMotorClient(DATABASE_HOST)
 # data database
-database = client[DATABASE_NAME]
-appointments_collection = database.appointments
-doctors_collection = database.doctors
+appointments_collection = LazyCollection("appointments")
+doctors_collection = LazyCollection("doctors")
+reservations_collection = LazyCollection("reservations")
+
+async def ping():
+    await get_client().admin.command('ping')
 
 async def check_connection():
     try:
-        await client.admin.command('ping')
+        await ping()
         print("Connection to mongodb database!")
         return True
     except Exception as e:
         print("Failed to connect to MongoDB:", e)
         return False
-    
\ No newline at end of file
@@ -1,77 +1,132 @@
 
 from typing import List, Optional, Dict, Any
-from datetime import datetime, time, date
-from fastapi import Body, HTTPException, APIRouter, Path, Query
+from datetime import datetime, time, date, timedelta
+from fastapi import Body, HTTPException, APIRouter, Path, Query, Response
 from pydantic import BaseModel, Field, EmailStr, validator
-from app.models.appoinments import AppointmentCreate, AppointmentResponse, AppointmentStatus, AppointmentUpdate, DentalSpecialization, DoctorResponse, DoctorUpdate
+from app.models.appoinments import AppointmentCreate, AppointmentResponse, AppointmentSort, AppointmentStatus, AppointmentUpdate, DentalSpecialization, DoctorResponse, DoctorSort, DoctorUpdate
 from bson import ObjectId
 from app.database import appointments_collection ,doctors_collection
+from app.services.availability import INACTIVE_STATUSES, fetch_booked_intervals, find_bookable_slots, format_minutes, mark_windows, overlap_filter
+from app.services.doctor_cache import doctor_cache, invalidate_doctor
+from app.services.reservations import check_aligned, insert_appointment, release_slots, reserve_slots
+from app.services.schedule_index import minute_fields, time_to_minutes
+from app.utils.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER, find_page
+from app.utils.responses import MongoJSONResponse, ResponseShape
 
 
 
 # Initialize router
 router = APIRouter()
 
+# Response models resolved once: what to fetch from Mongo and how to build the body without re-validating
+DOCTOR_SHAPE = ResponseShape(DoctorResponse)
+APPOINTMENT_SHAPE = ResponseShape(AppointmentResponse, extra_fields=["doctor_id"])
+
 # Helper functions
+def set_page_headers(response: Response, next_cursor: Optional[str], total_estimate: Optional[int]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total_estimate is not None:
+        # Collection-wide estimate from metadata, not a count of the filtered query
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(total_estimate)
+
 async def get_doctor_or_404(doctor_id: str):
-    doctor = await doctors_collection.find_one({"_id": ObjectId(doctor_id)})
+    doctor = await doctor_cache.get(doctor_id)
     if doctor is None:
         raise HTTPException(status_code=404, detail="Doctor not found")
     return doctor
 
-async def get_appointment_or_404(appointment_id: str):
-    appointment = await appointments_collection.find_one({"_id": ObjectId(appointment_id)})
+async def get_appointment_or_404(appointment_id: str, projection: Optional[dict] = None):
+    appointment = await appointments_collection.find_one({"_id": ObjectId(appointment_id)}, projection)
     if appointment is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return appointment
 
-async def check_doctor_availability(doctor_id: str, appointment_date: date, start_time: time, end_time: time):
+def build_appointment_query(
+    doctor_id: Optional[str] = None,
+    patient_email: Optional[str] = None,
+    appointment_date: Optional[date] = None,
+    status: Optional[AppointmentStatus] = None
+) -> dict:
+    query = {}
+    
+    if doctor_id:
+        query["doctor_id"] = ObjectId(doctor_id)
+    
+    if patient_email:
+        query["patient_email"] = patient_email
+    
+    if appointment_date:
+        query["appointment_date"] = appointment_date.isoformat()
+    
+    if status:
+        query["status"] = status
+    
+    return query
+
+# Only the fields embedded as the appointment's doctor summary
+DOCTOR_SUMMARY_PROJECTION = {"name": 1, "specialization": 1}
+
+async def attach_doctor_summaries(appointments: List[dict]) -> List[dict]:
+    """Embed the doctor summary in each appointment with a single $in query for the whole page"""
+    doctor_ids = list({appointment["doctor_id"] for appointment in appointments})
+    if not doctor_ids:
+        return appointments
+    
+    doctors = {}
+    cursor = doctors_collection.find({"_id": {"$in": doctor_ids}}, DOCTOR_SUMMARY_PROJECTION)
+    async for doctor in cursor:
+        doctors[doctor["_id"]] = {
+            "id": str(doctor["_id"]),
+            "name": doctor["name"],
+            "specialization": doctor["specialization"]
+        }
+    
+    for appointment in appointments:
+        summary = doctors.get(appointment["doctor_id"])
+        if summary:
+            appointment["doctor"] = summary
+    
+    return appointments
+
+async def check_doctor_availability(doctor_id: str, appointment_date: date, start_time: time, end_time: time,
+                                    exclude_appointment_id: Optional[ObjectId] = None):
     # Check if the doctor exists
     doctor = await get_doctor_or_404(doctor_id)
     
     # Check if the appointment date falls on one of the doctor's available days
     day_of_week = appointment_date.weekday()  # 0 is Monday, 6 is Sunday
+    schedule = doctor_cache.schedule_for(doctor)
     
-    doctor_available_on_day = False
-    doctor_available_at_time = False
-    
-    for schedule in doctor.get("availability", []):
-        if schedule["day_of_week"] == day_of_week:
-            doctor_available_on_day = True
-            for slot in schedule["time_slots"]:
-                slot_start = datetime.strptime(slot["start_time"], "%H:%M:%S").time()
-                slot_end = datetime.strptime(slot["end_time"], "%H:%M:%S").time()
-                
-                if slot_start <= start_time and end_time <= slot_end:
-                    doctor_available_at_time = True
-                    break
-    
-    if not doctor_available_on_day:
+    if not schedule.works_on(day_of_week):
         raise HTTPException(
             status_code=400, 
             detail=f"Doctor is not available on this day (day {day_of_week})"
         )
     
-    if not doctor_available_at_time:
+    if not schedule.contains(day_of_week, time_to_minutes(start_time), time_to_minutes(end_time, round_up=True)):
         raise HTTPException(
             status_code=400, 
             detail="Doctor is not available during this time slot"
         )
-    
-    # Check for overlapping appointments
-    existing_appointment = await appointments_collection.find_one({
+
+    # Rejected before any query; reserve_slots would refuse the write anyway
+    try:
+        check_aligned(time_to_minutes(start_time), time_to_minutes(end_time, round_up=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Check for overlapping appointments (other than the one being rescheduled):
+    # a range predicate on the integer-minute fields, with a fallback for unmigrated documents
+    overlap_query = {
         "doctor_id": ObjectId(doctor_id),
         "appointment_date": appointment_date.isoformat(),
         "status": {"$nin": [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]},
-        "$or": [
-            # New appointment starts during an existing appointment
-            {"start_time": {"$lte": start_time.isoformat()}, "end_time": {"$gt": start_time.isoformat()}},
-            # New appointment ends during an existing appointment
-            {"start_time": {"$lt": end_time.isoformat()}, "end_time": {"$gte": end_time.isoformat()}},
-            # New appointment contains an existing appointment
-            {"start_time": {"$gte": start_time.isoformat()}, "end_time": {"$lte": end_time.isoformat()}}
-        ]
-    })
+        **overlap_filter(time_to_minutes(start_time), time_to_minutes(end_time, round_up=True)),
+    }
+    if exclude_appointment_id is not None:
+        overlap_query["_id"] = {"$ne": exclude_appointment_id}
+    existing_appointment = await appointments_collection.find_one(overlap_query)
     
     if existing_appointment:
         raise HTTPException(
@@ -100,6 +155,7 @@ async def create_doctor(doctor: str= Body(...)):
     
     # Insert into database
     result = await doctors_collection.insert_one(doctor_dict)
+    invalidate_doctor(result.inserted_id)
     
     # Return created doctor
     created_doctor = await doctors_collection.find_one({"_id": result.inserted_id})
@@ -111,25 +167,28 @@ async def create_doctor(doctor: str= Body(...)):
 async def list_doctors(
     specialization: Optional[DentalSpecialization] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description=f"Continuation token from the {NEXT_CURSOR_HEADER} header"),
+    sort: DoctorSort = DoctorSort.CREATED_AT,
+    descending: bool = False,
+    include_total: bool = False
 ):
     query = {}
     if specialization:
         query["specialization"] = specialization
     
-    doctors = []
-    cursor = doctors_collection.find(query).skip(skip).limit(limit)
-    async for doctor in cursor:
-        doctor["id"] = str(doctor["_id"])
-        doctors.append(doctor)
+    doctors, next_cursor = await find_page(
+        doctors_collection, query, sort.value, descending, limit, skip, cursor, DOCTOR_SHAPE.projection
+    )
     
-    return doctors
+    response = MongoJSONResponse(DOCTOR_SHAPE.build_many(doctors))
+    set_page_headers(response, next_cursor, await doctors_collection.estimated_document_count() if include_total else None)
+    return response
 
 @router.get("/doctors/{doctor_id}", response_model=DoctorResponse)
 async def get_doctor(doctor_id: str = Path(...)):
     doctor = await get_doctor_or_404(doctor_id)
-    doctor["id"] = str(doctor["_id"])
-    return doctor
+    return MongoJSONResponse(DOCTOR_SHAPE.build(doctor))
 
 @router.patch("/doctors/{doctor_id}", response_model=DoctorResponse)
 async def update_doctor(
@@ -137,16 +196,14 @@ async def update_doctor(
     doctor_update: DoctorUpdate = Body(...)
 ):
     # Check if doctor exists
-    await get_doctor_or_404(doctor_id)
+    doctor = await get_doctor_or_404(doctor_id)
     
     # Filter out None values
     update_data = {k: v for k, v in doctor_update.dict().items() if v is not None}
     
     # If there's nothing to update, return the doctor as is
     if not update_data:
-        doctor = await get_doctor_or_404(doctor_id)
-        doctor["id"] = str(doctor["_id"])
-        return doctor
+        return MongoJSONResponse(DOCTOR_SHAPE.build(doctor))
     
     # Add updated_at timestamp
     update_data["updated_at"] = datetime.now()
@@ -156,12 +213,11 @@ async def update_doctor(
         {"_id": ObjectId(doctor_id)},
         {"$set": update_data}
     )
+    invalidate_doctor(doctor_id)
     
     # Return updated doctor
     updated_doctor = await get_doctor_or_404(doctor_id)
-    updated_doctor["id"] = str(updated_doctor["_id"])
-    
-    return updated_doctor
+    return MongoJSONResponse(DOCTOR_SHAPE.build(updated_doctor))
 
 @router.delete("/doctors/{doctor_id}", status_code=204)
 async def delete_doctor(doctor_id: str = Path(...)):
@@ -179,6 +235,7 @@ async def delete_doctor(doctor_id: str = Path(...)):
     
     # Delete doctor
     await doctors_collection.delete_one({"_id": ObjectId(doctor_id)})
+    invalidate_doctor(doctor_id)
     
     return None
 
@@ -199,15 +256,19 @@ async def create_appointment(appointment: AppointmentCreate = Body(...)):
         end_time=appointment_dict["end_time"]
     )
     
+    # Dates and times are stored as ISO strings
+    for key in ("appointment_date", "start_time", "end_time"):
+        appointment_dict[key] = appointment_dict[key].isoformat()
+    
     # Add timestamps
     appointment_dict["created_at"] = datetime.now()
     appointment_dict["updated_at"] = datetime.now()
     
-    # Insert into database
-    result = await appointments_collection.insert_one(appointment_dict)
+    # Reserve the slot and insert; a concurrent booking of the same slot fails here
+    inserted_id = await insert_appointment(appointment_dict)
     
     # Return created appointment
-    created_appointment = await appointments_collection.find_one({"_id": result.inserted_id})
+    created_appointment = await appointments_collection.find_one({"_id": inserted_id})
     created_appointment["id"] = str(created_appointment["_id"])
     
     # Add doctor information
@@ -227,56 +288,34 @@ async def list_appointments(
     appointment_date: Optional[date] = None,
     status: Optional[AppointmentStatus] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description=f"Continuation token from the {NEXT_CURSOR_HEADER} header"),
+    sort: AppointmentSort = AppointmentSort.DATE,
+    descending: bool = False,
+    include_total: bool = False
 ):
-    query = {}
-    
-    if doctor_id:
-        query["doctor_id"] = ObjectId(doctor_id)
-    
-    if patient_email:
-        query["patient_email"] = patient_email
-    
-    if appointment_date:
-        query["appointment_date"] = appointment_date.isoformat()
+    query = build_appointment_query(doctor_id, patient_email, appointment_date, status)
     
-    if status:
-        query["status"] = status
-    
-    appointments = []
-    cursor = appointments_collection.find(query).skip(skip).limit(limit)
+    # Keyset pages stay O(limit) however deep the history goes; skip/limit still works
+    appointments, next_cursor = await find_page(
+        appointments_collection, query, sort.value, descending, limit, skip, cursor, APPOINTMENT_SHAPE.projection
+    )
     
-    async for appointment in cursor:
-        appointment["id"] = str(appointment["_id"])
-        
-        # Add doctor information
-        doctor = await doctors_collection.find_one({"_id": appointment["doctor_id"]})
-        if doctor:
-            appointment["doctor"] = {
-                "id": str(doctor["_id"]),
-                "name": doctor["name"],
-                "specialization": doctor["specialization"]
-            }
-        
-        appointments.append(appointment)
+    # Add doctor information: one round trip for the page instead of one per appointment
+    await attach_doctor_summaries(appointments)
     
-    return appointments
+    response = MongoJSONResponse(APPOINTMENT_SHAPE.build_many(appointments))
+    set_page_headers(response, next_cursor, await appointments_collection.estimated_document_count() if include_total else None)
+    return response
 
 @router.get("/appointments/{appointment_id}", response_model=AppointmentResponse)
 async def get_appointment(appointment_id: str = Path(...)):
-    appointment = await get_appointment_or_404(appointment_id)
-    appointment["id"] = str(appointment["_id"])
+    appointment = await get_appointment_or_404(appointment_id, APPOINTMENT_SHAPE.projection)
     
     # Add doctor information
-    doctor = await doctors_collection.find_one({"_id": appointment["doctor_id"]})
-    if doctor:
-        appointment["doctor"] = {
-            "id": str(doctor["_id"]),
-            "name": doctor["name"],
-            "specialization": doctor["specialization"]
-        }
+    await attach_doctor_summaries([appointment])
     
-    return appointment
+    return MongoJSONResponse(APPOINTMENT_SHAPE.build(appointment))
 
 @router.patch("/appointments/{appointment_id}", response_model=AppointmentResponse)
 async def update_appointment(
@@ -291,33 +330,55 @@ async def update_appointment(
     
     # If there's nothing to update, return the appointment as is
     if not update_data:
-        appointment = await get_appointment_or_404(appointment_id)
         appointment["id"] = str(appointment["_id"])
+        await attach_doctor_summaries([appointment])
         return appointment
     
-    # Check availability if appointment time is being updated
-    if "appointment_date" in update_data or "start_time" in update_data or "end_time" in update_data:
+    # Dates and times are stored as ISO strings
+    for key in ("appointment_date", "start_time", "end_time"):
+        if key in update_data:
+            update_data[key] = update_data[key].isoformat()
+    
+    time_changed = "appointment_date" in update_data or "start_time" in update_data or "end_time" in update_data
+    if time_changed:
+        update_data.update(minute_fields(
+            update_data.get("start_time", appointment["start_time"]),
+            update_data.get("end_time", appointment["end_time"])
+        ))
+    was_active = appointment["status"] not in INACTIVE_STATUSES
+    will_be_active = update_data.get("status", appointment["status"]) not in INACTIVE_STATUSES
+    
+    # Check availability and move the slot reservation if the appointment (still) occupies a slot
+    if will_be_active and (time_changed or not was_active):
         appointment_date = update_data.get("appointment_date", appointment["appointment_date"])
         start_time = update_data.get("start_time", appointment["start_time"])
         end_time = update_data.get("end_time", appointment["end_time"])
         
-        if isinstance(appointment_date, str):
-            appointment_date = date.fromisoformat(appointment_date)
-        
-        if isinstance(start_time, str):
-            start_time = datetime.strptime(start_time, "%H:%M:%S").time()
-        
-        if isinstance(end_time, str):
-            end_time = datetime.strptime(end_time, "%H:%M:%S").time()
+        await check_doctor_availability(
+            doctor_id=str(appointment["doctor_id"]),
+            appointment_date=date.fromisoformat(appointment_date),
+            start_time=time.fromisoformat(start_time),
+            end_time=time.fromisoformat(end_time),
+            exclude_appointment_id=appointment["_id"]
+        )
         
-        # Only check availability if the appointment is still active
-        if appointment["status"] not in [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]:
-            await check_doctor_availability(
-                doctor_id=str(appointment["doctor_id"]),
-                appointment_date=appointment_date,
-                start_time=start_time,
-                end_time=end_time
-            )
+        await release_slots(appointment["_id"])
+        try:
+            await reserve_slots(appointment["_id"], appointment["doctor_id"], appointment_date, start_time, end_time)
+        except HTTPException:
+            if was_active:
+                # Lost the race for the new slot: keep the old one
+                await reserve_slots(
+                    appointment["_id"],
+                    appointment["doctor_id"],
+                    appointment["appointment_date"],
+                    appointment["start_time"],
+                    appointment["end_time"]
+                )
+            raise
+    elif was_active and not will_be_active:
+        # Cancelled or no-show frees the slot for someone else
+        await release_slots(appointment["_id"])
     
     # Add updated_at timestamp
     update_data["updated_at"] = datetime.now()
@@ -333,13 +394,7 @@ async def update_appointment(
     updated_appointment["id"] = str(updated_appointment["_id"])
     
     # Add doctor information
-    doctor = await doctors_collection.find_one({"_id": updated_appointment["doctor_id"]})
-    if doctor:
-        updated_appointment["doctor"] = {
-            "id": str(doctor["_id"]),
-            "name": doctor["name"],
-            "specialization": doctor["specialization"]
-        }
+    await attach_doctor_summaries([updated_appointment])
     
     return updated_appointment
 
@@ -350,6 +405,7 @@ async def delete_appointment(appointment_id: str = Path(...)):
     
     # Delete appointment
     await appointments_collection.delete_one({"_id": ObjectId(appointment_id)})
+    await release_slots(ObjectId(appointment_id))
     
     return None
 
@@ -358,66 +414,47 @@ async def delete_appointment(appointment_id: str = Path(...)):
 async def get_doctor_availability(
     doctor_id: str = Path(...),
     start_date: date = Query(...),
-    end_date: date = Query(...)
+    end_date: date = Query(...),
+    duration: Optional[int] = Query(None, ge=5, le=480, description="Return bookable slots of this many minutes")
 ):
     # Check if doctor exists
     doctor = await get_doctor_or_404(doctor_id)
     
-    # Calculate number of days
-    delta = end_date - start_date
-    
     availability_slots = []
     
+    # Concrete bookable sub-slots with the booked time subtracted
+    if duration:
+        slots_by_date = await find_bookable_slots(doctor, start_date, end_date, duration)
+        for current_iso, slots in slots_by_date.items():
+            for slot_start, slot_end in slots:
+                availability_slots.append({
+                    "date": current_iso,
+                    "start_time": format_minutes(slot_start),
+                    "end_time": format_minutes(slot_end),
+                    "is_available": True
+                })
+        return availability_slots
+    
+    schedule = doctor_cache.schedule_for(doctor)
+    
+    # All bookings in the range with one query, grouped by date
+    booked_by_date = await fetch_booked_intervals(doctor_id, start_date, end_date)
+    
     # For each day in the range
-    for day in range(delta.days + 1):
-        current_date = start_date + datetime.timedelta(days=day)
+    for day in range((end_date - start_date).days + 1):
+        current_date = start_date + timedelta(days=day)
         day_of_week = current_date.weekday()
+        if not schedule.works_on(day_of_week):
+            continue
         
-        # Find if the doctor works on this day
-        day_schedule = None
-        for schedule in doctor.get("availability", []):
-            if schedule["day_of_week"] == day_of_week:
-                day_schedule = schedule
-                break
-        
-        if day_schedule:
-            # Get all appointments for this doctor on this day
-            appointments = []
-            cursor = appointments_collection.find({
-                "doctor_id": ObjectId(doctor_id),
-                "appointment_date": current_date.isoformat(),
-                "status": {"$nin": [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]}
+        current_iso = current_date.isoformat()
+        booked = booked_by_date.get(current_iso, [])
+        for slot_start, slot_end, is_available in mark_windows(schedule.windows(day_of_week), booked):
+            availability_slots.append({
+                "date": current_iso,
+                "start_time": format_minutes(slot_start),
+                "end_time": format_minutes(slot_end),
+                "is_available": is_available
             })
-            
-            async for appointment in cursor:
-                appointments.append({
-                    "start_time": appointment["start_time"],
-                    "end_time": appointment["end_time"]
-                })
-            
-            # For each time slot, calculate available slots
-            for slot in day_schedule["time_slots"]:
-                slot_start = datetime.strptime(slot["start_time"], "%H:%M:%S").time()
-                slot_end = datetime.strptime(slot["end_time"], "%H:%M:%S").time()
-                
-                # Default slot is available
-                available_slot = {
-                    "date": current_date.isoformat(),
-                    "start_time": slot_start.isoformat(),
-                    "end_time": slot_end.isoformat(),
-                    "is_available": True
-                }
-                
-                # Check if any appointment overlaps with this slot
-                for appointment in appointments:
-                    appt_start = datetime.strptime(appointment["start_time"], "%H:%M:%S").time()
-                    appt_end = datetime.strptime(appointment["end_time"], "%H:%M:%S").time()
-                    
-                    # Check if appointment overlaps with the slot
-                    if not (appt_end <= slot_start or appt_start >= slot_end):
-                        available_slot["is_available"] = False
-                        break
-                
-                availability_slots.append(available_slot)
     
     return availability_slots
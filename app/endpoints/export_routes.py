@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import date
+from enum import Enum
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import EXPORT_BATCH_SIZE, EXPORT_CHUNK_ROWS
+from app.database import appointments_collection
+from app.endpoints.appoinments_routes import build_appointment_query
+from app.models.appoinments import AppointmentStatus
+
+router = APIRouter()
+
+# Columns of an export row; also the projection sent to Mongo
+EXPORT_FIELDS = [
+    "_id",
+    "doctor_id",
+    "patient_name",
+    "patient_email",
+    "patient_phone",
+    "appointment_date",
+    "start_time",
+    "end_time",
+    "status",
+    "reason",
+    "notes",
+    "created_at",
+    "updated_at",
+]
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+def _ndjson_row(appointment: dict) -> str:
+    # ObjectId/datetime fall back to str
+    return json.dumps(appointment, default=str, ensure_ascii=False) + "\n"
+
+
+def _csv_rows():
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+
+    def render(appointment: Optional[dict]) -> str:
+        if appointment is None:
+            writer.writeheader()
+        else:
+            writer.writerow(appointment)
+        row = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return row
+
+    return render
+
+
+async def stream_appointments(query: dict, export_format: ExportFormat, batch_size: int) -> AsyncIterator[str]:
+    """Rows straight from the Motor cursor, a chunk at a time; memory stays flat regardless of result size"""
+    render = _ndjson_row if export_format == ExportFormat.NDJSON else _csv_rows()
+    chunk = [render(None)] if export_format == ExportFormat.CSV else []
+
+    cursor = appointments_collection.find(query, EXPORT_PROJECTION).batch_size(batch_size)
+    async for appointment in cursor:
+        chunk.append(render(appointment))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+@router.get("/exports/appointments")
+async def export_appointments(
+    doctor_id: Optional[str] = None,
+    patient_email: Optional[str] = None,
+    appointment_date: Optional[date] = None,
+    status: Optional[AppointmentStatus] = None,
+    format: ExportFormat = ExportFormat.NDJSON,
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=10000)
+):
+    query = build_appointment_query(doctor_id, patient_email, appointment_date, status)
+    media_type = "application/x-ndjson" if format == ExportFormat.NDJSON else "text/csv"
+    return StreamingResponse(
+        stream_appointments(query, format, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="appointments.{format.value}"'}
+    )
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query, Request
+
+from app.services.bulk_import import import_appointments, import_doctors, iter_lines
+
+router = APIRouter()
+
+
+@router.post("/imports/doctors")
+async def import_doctors_ndjson(request: Request):
+    """Bulk-create doctors from an NDJSON body (one DoctorCreate object per line)"""
+    return await import_doctors(iter_lines(request.stream()))
+
+
+@router.post("/imports/appointments")
+async def import_appointments_ndjson(
+    request: Request,
+    check_schedule: bool = Query(True, description="Reject rows outside the doctor's weekly schedule")
+):
+    """Bulk-create appointments from an NDJSON body (AppointmentCreate fields plus doctor_id per line)"""
+    return await import_appointments(iter_lines(request.stream()), check_schedule=check_schedule)
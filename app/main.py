@@ -1,7 +1,8 @@
-from fastapi import FastAPI, WebSocket
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 import os
-import uvicorn
 import sys
 from pathlib import Path
 
@@ -15,10 +16,73 @@ from pathlib import Path
 from app.api.routes import router
 from app.api.websocket import websocket_proxy_handler
 from app.endpoints.appoinments_routes import router as appointments_router
+from app.endpoints.export_routes import router as export_router
+from app.endpoints.import_routes import router as import_router
+from app.config import OPENAI_API_KEY, QUERY_PROFILE_HEADERS, READY_RETRY_INTERVAL
+from app.database import close_client, get_client, ping
+from app.models.schemas import SessionRequest
+from app.services.doctor_cache import run_cache_invalidator
+from app.services.http_client import close_http_client, start_http_client
+from app.services.doctor_search import doctor_search_index
+from app.services.indexes import ensure_indexes
+from app.services.readiness import readiness
+from app.services.query_profiler import QUERY_COMMANDS_HEADER, QUERY_COUNT_HEADER, QUERY_TIME_HEADER, profile_queries
+from app.services.session_registry import session_registry
+from app.services.shared_state import shared_store
+from app.services.token_pool import session_token_pool
+from app.utils.migrate_times import migrate
+from app.utils.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
+
+
+async def warm_up():
+    """Startup work that needs Mongo, off the critical path; /api/ready answers 503 until it is done"""
+    steps = [
+        ("mongo", ping),
+        # Idempotent: declares the indexes every query shape relies on
+        ("indexes", ensure_indexes),
+        # Overlap checks only match appointments with minute fields; a no-op once everything is migrated
+        ("time_fields", migrate),
+        # Build the doctor name search index now rather than on the first voice lookup
+        ("doctor_search", doctor_search_index.refresh),
+    ]
+    for name, step in steps:
+        while True:
+            try:
+                await step()
+                readiness.set(name)
+                break
+            except Exception as e:
+                print(f"[Startup] {name} not ready yet: {e}")
+                await asyncio.sleep(READY_RETRY_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created here, not at import: pools only, connections open on demand
+    await start_http_client()
+    get_client()
+    readiness.expect("mongo", "indexes", "time_fields", "doctor_search")
+    readiness.set("openai_api_key", bool(OPENAI_API_KEY))
+    warm_up_task = asyncio.create_task(warm_up())
+    if OPENAI_API_KEY:
+        # Keep tokens for the default session settings ready before the first click
+        defaults = SessionRequest()
+        session_token_pool.warm(defaults.model, defaults.voice, defaults.system_prompt)
+        session_token_pool.start()
+    invalidator_task = asyncio.create_task(run_cache_invalidator())
+    yield
+    # Already drained when run through app/run.py; covers plain `uvicorn app.main:app`
+    await session_registry.drain()
+    warm_up_task.cancel()
+    invalidator_task.cancel()
+    await session_token_pool.stop()
+    await close_http_client()
+    await shared_store.close()
+    close_client()
 
 
 # Create FastAPI application
-app = FastAPI(title="OpenAI Realtime API Server")
+app = FastAPI(title="OpenAI Realtime API Server", lifespan=lifespan)
 
 # Configure CORS properly - this is important!
 app.add_middleware(
@@ -27,11 +91,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods including OPTIONS
     allow_headers=["*"],  # Allow all headers including Authorization, Content-Type, etc.
+    # Browsers hide non-safelisted response headers from scripts unless exposed
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER] + (
+        [QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QUERY_COMMANDS_HEADER] if QUERY_PROFILE_HEADERS else []
+    ),
 )
 
+# Attribute every Mongo query to the route that issued it (see /api/queries/stats)
+@app.middleware("http")
+async def profile_mongo_queries(request: Request, call_next):
+    with profile_queries(f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            profile.label = f"{request.method} {route.path}"
+    if QUERY_PROFILE_HEADERS:
+        response.headers[QUERY_COUNT_HEADER] = str(profile.count)
+        response.headers[QUERY_TIME_HEADER] = f"{profile.total_ms:.2f}"
+        response.headers[QUERY_COMMANDS_HEADER] = profile.summary()
+    return response
+
 # Include routers
 app.include_router(router, tags=["general"])
 app.include_router(appointments_router, prefix="/api/v1", tags=["appointments and doctors"])
+app.include_router(export_router, prefix="/api/v1", tags=["exports"])
+app.include_router(import_router, prefix="/api/v1", tags=["imports"])
 
 # WebSocket endpoint
 @app.websocket("/ws/proxy")
@@ -40,4 +124,6 @@ async def websocket_proxy(websocket: WebSocket):
 
 # Add this block to enable direct execution of this file
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
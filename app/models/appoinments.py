@@ -22,6 +22,16 @@ class AppointmentStatus(str, Enum):
     CANCELLED = "cancelled"
     NO_SHOW = "no_show"
 
+# Sort orders for the list endpoints (ties are broken by _id)
+class DoctorSort(str, Enum):
+    NAME = "name"
+    CREATED_AT = "created_at"
+
+
+class AppointmentSort(str, Enum):
+    DATE = "appointment_date"
+    CREATED_AT = "created_at"
+
 # Base models
 class TimeSlot(BaseModel):
     start_time: time
@@ -1,12 +1,45 @@
+import argparse
 import sys
 import os
 from pathlib import Path
 
 # Add the parent directory to sys.path
 sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Now import the app
 import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.config import SHARED_STATE_URL, WEB_HOST, WEB_PORT, WEB_WORKERS
+from app.server import DrainingServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument("--host", default=WEB_HOST)
+    parser.add_argument("--port", type=int, default=WEB_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="worker processes sharing the port")
+    parser.add_argument("--reload", action="store_true", help="single process with auto-reload, for development")
+    args = parser.parse_args()
+
+    if args.workers > 1 and SHARED_STATE_URL.startswith("memory://"):
+        # Each worker would get its own token pool, rate limit counters and cache invalidations
+        parser.error(f"--workers {args.workers} needs SHARED_STATE_URL=redis://...; memory:// only spans one process")
+
+    if args.reload:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    config = uvicorn.Config("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    server = DrainingServer(config=config)
+    if config.workers > 1:
+        # Same layout as `uvicorn --workers`: one bound socket, N processes accepting on it
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    main()
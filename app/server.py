@@ -0,0 +1,17 @@
+import uvicorn
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that lets open voice sessions finish before shutting down.
+
+    uvicorn closes every WebSocket (code 1012) as soon as shutdown starts,
+    before the app's lifespan shutdown runs, so draining has to happen here.
+    While draining, /api/ready answers 503 and new /ws/proxy sessions are refused.
+    """
+
+    async def shutdown(self, sockets=None):
+        # Imported here so the supervisor process never loads the app
+        from app.services.session_registry import session_registry
+
+        await session_registry.drain()
+        await super().shutdown(sockets=sockets)
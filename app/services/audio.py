@@ -0,0 +1,20 @@
+import base64
+
+# The append event is built by hand: base64 output never needs JSON escaping,
+# so the only allocation per frame is the encoded audio itself.
+_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+_APPEND_SUFFIX = '"}'
+
+
+def pcm16_to_append_event(data: bytes) -> str:
+    """Wrap a raw PCM16 binary frame from the browser as an upstream append event"""
+    view = memoryview(data)
+    if len(view) % 2:
+        # PCM16 samples are 2 bytes; drop a trailing half sample without copying
+        view = view[:-1]
+    return _APPEND_PREFIX + base64.b64encode(view).decode("ascii") + _APPEND_SUFFIX
+
+
+def audio_delta_to_pcm16(delta: str) -> bytes:
+    """Decode the base64 audio of a response.audio.delta event for a binary frame"""
+    return base64.b64decode(delta)
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from bson import ObjectId
+
+from app.config import LEGACY_TIME_FIELDS, RESERVATION_GRANULARITY_MINUTES
+from app.database import appointments_collection
+from app.models.appoinments import AppointmentStatus
+from app.services.doctor_cache import doctor_cache
+from app.services.schedule_index import Interval, to_minutes, to_minutes_ceil
+
+# Appointments in these states do not occupy their slot
+INACTIVE_STATUSES = [AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def overlap_filter(start: int, end: int) -> dict:
+    """Appointments overlapping [start, end) minutes: one range predicate on the minute fields.
+
+    Every appointment carries them once the startup migration (or
+    python -m app.utils.migrate_times) has run; LEGACY_TIME_FIELDS adds an
+    ISO-string branch for documents written before that, at the cost of an $or.
+    """
+    in_range = {"start_minute": {"$lt": end}, "end_minute": {"$gt": start}}
+    if not LEGACY_TIME_FIELDS:
+        return in_range
+    return {"$or": [
+        in_range,
+        {
+            "start_minute": {"$exists": False},
+            "start_time": {"$lt": format_minutes(end)},
+            "end_time": {"$gt": format_minutes(start)},
+        },
+    ]}
+
+
+def booked_interval(appointment: dict) -> Interval:
+    if "start_minute" in appointment:
+        return appointment["start_minute"], appointment["end_minute"]
+    # Not migrated yet (python -m app.utils.migrate_times)
+    return to_minutes(appointment["start_time"]), to_minutes_ceil(appointment["end_time"])
+
+
+async def fetch_booked_intervals(doctor_id: str, start_date: date, end_date: date) -> Dict[str, List[Interval]]:
+    """Active bookings of a doctor over a date range in one query, grouped by ISO date and sorted"""
+    booked: Dict[str, List[Interval]] = defaultdict(list)
+    cursor = appointments_collection.find(
+        {
+            "doctor_id": ObjectId(doctor_id),
+            # ISO dates compare correctly as strings
+            "appointment_date": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()},
+            "status": {"$nin": INACTIVE_STATUSES},
+        },
+        {"_id": 0, "appointment_date": 1, "start_minute": 1, "end_minute": 1, "start_time": 1, "end_time": 1},
+    )
+    async for appointment in cursor:
+        booked[appointment["appointment_date"]].append(booked_interval(appointment))
+    for day_booked in booked.values():
+        day_booked.sort()
+    return booked
+
+
+def mark_windows(windows: List[Interval], booked: List[Interval]) -> List[Tuple[int, int, bool]]:
+    """Sweep sorted windows against sorted bookings: (start, end, is_available) in linear time"""
+    result = []
+    j = 0
+    for window_start, window_end in windows:
+        # Bookings that end before this window can't touch any later window either
+        while j < len(booked) and booked[j][1] <= window_start:
+            j += 1
+
+        available = True
+        k = j
+        while k < len(booked) and booked[k][0] < window_end:
+            if booked[k][1] > window_start:
+                available = False
+                break
+            k += 1
+        result.append((window_start, window_end, available))
+    return result
+
+
+def subtract_intervals(windows: List[Interval], booked: List[Interval]) -> List[Interval]:
+    """Free parts of the sorted working windows once the sorted bookings are removed"""
+    free = []
+    j = 0
+    for window_start, window_end in windows:
+        while j < len(booked) and booked[j][1] <= window_start:
+            j += 1
+
+        cursor = window_start
+        k = j
+        while k < len(booked) and booked[k][0] < window_end:
+            booked_start, booked_end = booked[k]
+            if booked_start > cursor:
+                free.append((cursor, booked_start))
+            cursor = max(cursor, booked_end)
+            k += 1
+        if cursor < window_end:
+            free.append((cursor, window_end))
+    return free
+
+
+def align_intervals(free: List[Interval], granularity: int) -> List[Interval]:
+    """Shrink intervals to reservation bucket boundaries, dropping any left empty"""
+    aligned = []
+    for start, end in free:
+        start = -(-start // granularity) * granularity
+        end = end // granularity * granularity
+        if start < end:
+            aligned.append((start, end))
+    return aligned
+
+
+def split_into_slots(free: List[Interval], duration: int, step: int = 0) -> List[Interval]:
+    """Cut free intervals into bookable slots of ``duration`` minutes, one every ``step`` (default: back to back)"""
+    step = step or duration
+    slots = []
+    for free_start, free_end in free:
+        start = free_start
+        while start + duration <= free_end:
+            slots.append((start, start + duration))
+            start += step
+    return slots
+
+
+async def find_bookable_slots(doctor: dict, start_date: date, end_date: date, duration: int) -> Dict[str, List[Interval]]:
+    """Bookable slots of ``duration`` minutes per ISO date, for both the REST API and the voice agent"""
+    schedule = doctor_cache.schedule_for(doctor)
+    booked_by_date = await fetch_booked_intervals(str(doctor["_id"]), start_date, end_date)
+    # Only offer what can be reserved: bucket-aligned starts and a whole number of buckets
+    duration = -(-duration // RESERVATION_GRANULARITY_MINUTES) * RESERVATION_GRANULARITY_MINUTES
+
+    slots_by_date = {}
+    for day in range((end_date - start_date).days + 1):
+        current_date = start_date + timedelta(days=day)
+        if not schedule.works_on(current_date.weekday()):
+            continue
+        current_iso = current_date.isoformat()
+        free = subtract_intervals(schedule.windows(current_date.weekday()), booked_by_date.get(current_iso, []))
+        free = align_intervals(free, RESERVATION_GRANULARITY_MINUTES)
+        slots = split_into_slots(free, duration)
+        if slots:
+            slots_by_date[current_iso] = slots
+    return slots_by_date
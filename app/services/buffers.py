@@ -0,0 +1,74 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, FrozenSet, Optional, Tuple
+
+
+class FrameBuffer:
+    """Bounded FIFO of WebSocket frames between one producer and one consumer.
+
+    When the buffer reaches ``high_watermark`` it first evicts the oldest
+    droppable frame (stale audio, so the newest audio survives); if there is
+    nothing to drop the producer waits until the consumer drains it down to
+    ``low_watermark``.
+    """
+
+    def __init__(self, name: str, high_watermark: int, low_watermark: int,
+                 droppable_types: FrozenSet[str] = frozenset()):
+        if not 0 <= low_watermark < high_watermark:
+            raise ValueError(f"{name}: need 0 <= low_watermark < high_watermark")
+        self.name = name
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.droppable_types = droppable_types
+
+        self._frames: Deque[Tuple[bool, Any]] = deque()
+        self._not_empty = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+        self.max_depth = 0
+        self.dropped = 0
+        self.pauses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    async def put(self, frame: Any, event_type: Optional[str] = None):
+        droppable = event_type in self.droppable_types
+        while len(self._frames) >= self.high_watermark:
+            if self._drop_oldest_droppable():
+                continue
+            # Only must-deliver frames are queued: push back on the producer
+            self.pauses += 1
+            self._drained.clear()
+            await self._drained.wait()
+
+        self._frames.append((droppable, frame))
+        self.max_depth = max(self.max_depth, len(self._frames))
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        while not self._frames:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        _, frame = self._frames.popleft()
+        if len(self._frames) <= self.low_watermark:
+            self._drained.set()
+        return frame
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": len(self._frames),
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "pauses": self.pauses,
+        }
+
+    def _drop_oldest_droppable(self) -> bool:
+        for index, (droppable, _) in enumerate(self._frames):
+            if droppable:
+                del self._frames[index]
+                self.dropped += 1
+                return True
+        return False
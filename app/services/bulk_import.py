@@ -0,0 +1,319 @@
+import json
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import ValidationError
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from app.config import IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS
+from app.database import appointments_collection, doctors_collection, reservations_collection
+from app.models.appoinments import AppointmentCreate, DoctorCreate
+from app.services.availability import INACTIVE_STATUSES, booked_interval
+from app.services.doctor_cache import invalidate_doctor
+from app.services.reservations import check_aligned, slot_keys
+from app.services.schedule_index import Interval, WeeklySchedule, minute_fields
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def fail(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+Line = Union[str, bytes]
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream (request body or file) into lines without buffering all of it.
+
+    Lines stay undecoded so iter_chunks can report bad UTF-8 against its line number.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def iter_chunks(lines: AsyncIterable[Line], report: ImportReport,
+                      chunk_size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[List[Tuple[int, dict]]]:
+    """Parsed (line number, row) chunks; blank lines are skipped, bad UTF-8, bad JSON and non-objects are reported"""
+    chunk = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError as e:
+                report.fail(line_number, f"Invalid UTF-8: {e}")
+                continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            report.fail(line_number, f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            report.fail(line_number, f"Expected a JSON object, got {type(row).__name__}")
+            continue
+        chunk.append((line_number, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+async def import_doctors(lines: AsyncIterable[Line], chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    report = ImportReport()
+    async for chunk in iter_chunks(lines, report, chunk_size):
+        valid: List[Tuple[int, dict]] = []
+        for line_number, row in chunk:
+            try:
+                doctor = DoctorCreate(**row).model_dump(mode="json")
+            except ValidationError as e:
+                report.fail(line_number, _validation_message(e))
+                continue
+            valid.append((line_number, doctor))
+
+        # Duplicate emails: one query per chunk for existing doctors, a set for the chunk itself
+        emails = [doctor["email"] for _, doctor in valid]
+        existing = {d["email"] async for d in doctors_collection.find({"email": {"$in": emails}}, {"email": 1})}
+        seen: Set[str] = set()
+        operations, line_numbers = [], []
+        now = datetime.now()
+        for line_number, doctor in valid:
+            if doctor["email"] in existing or doctor["email"] in seen:
+                report.fail(line_number, "A doctor with this email already exists")
+                continue
+            seen.add(doctor["email"])
+            doctor["created_at"] = now
+            doctor["updated_at"] = now
+            operations.append(InsertOne(doctor))
+            line_numbers.append(line_number)
+
+        inserted, _ = await _bulk_insert(doctors_collection, operations, line_numbers, report)
+        report.inserted += inserted
+
+    invalidate_doctor()
+    return report.as_dict()
+
+
+class ScheduleSnapshot:
+    """In-memory view of doctor schedules and booked intervals, extended as rows are accepted.
+
+    Loaded lazily, one query per chunk for new doctors and one for new (doctor, date) pairs.
+    """
+
+    def __init__(self, check_schedule: bool = True):
+        self.check_schedule = check_schedule
+        self.schedules: Dict[ObjectId, Optional[WeeklySchedule]] = {}
+        self.booked: Dict[Tuple[ObjectId, str], List[Interval]] = {}
+
+    async def load(self, rows: List[dict]):
+        doctor_ids = list({row["doctor_id"] for row in rows} - self.schedules.keys())
+        if doctor_ids:
+            for doctor_id in doctor_ids:
+                self.schedules[doctor_id] = None
+            cursor = doctors_collection.find({"_id": {"$in": doctor_ids}}, {"availability": 1})
+            async for doctor in cursor:
+                self.schedules[doctor["_id"]] = WeeklySchedule(doctor.get("availability", []))
+
+        pairs = {(row["doctor_id"], row["appointment_date"]) for row in rows} - self.booked.keys()
+        if pairs:
+            for pair in pairs:
+                self.booked[pair] = []
+            cursor = appointments_collection.find(
+                {
+                    "doctor_id": {"$in": list({doctor_id for doctor_id, _ in pairs})},
+                    "appointment_date": {"$in": list({day for _, day in pairs})},
+                    "status": {"$nin": INACTIVE_STATUSES},
+                },
+                {"doctor_id": 1, "appointment_date": 1, "start_minute": 1, "end_minute": 1, "start_time": 1, "end_time": 1},
+            )
+            async for appointment in cursor:
+                key = (appointment["doctor_id"], appointment["appointment_date"])
+                if key in pairs:
+                    insort(self.booked[key], booked_interval(appointment))
+
+    def check(self, row: dict) -> Optional[str]:
+        """Reason the row cannot be booked, or None; accepted rows are added to the snapshot"""
+        schedule = self.schedules.get(row["doctor_id"])
+        if schedule is None:
+            return "Doctor not found"
+
+        start, end = row["start_minute"], row["end_minute"]
+        if self.check_schedule:
+            weekday = date.fromisoformat(row["appointment_date"]).weekday()
+            if not schedule.contains(weekday, start, end):
+                return "Doctor is not available during this time slot"
+
+        if row["status"] in INACTIVE_STATUSES:
+            return None
+
+        booked = self.booked[(row["doctor_id"], row["appointment_date"])]
+        index = bisect_left(booked, (start, end))
+        # Sorted, non-overlapping intervals: only the neighbours can overlap
+        if index > 0 and booked[index - 1][1] > start:
+            return "This time slot is already booked"
+        if index < len(booked) and booked[index][0] < end:
+            return "This time slot is already booked"
+        booked.insert(index, (start, end))
+        return None
+
+    def release(self, row: dict):
+        """Take back an accepted row's interval when the row is not written after all"""
+        if row["status"] in INACTIVE_STATUSES:
+            return
+        booked = self.booked[(row["doctor_id"], row["appointment_date"])]
+        interval = (row["start_minute"], row["end_minute"])
+        index = bisect_left(booked, interval)
+        if index < len(booked) and booked[index] == interval:
+            del booked[index]
+
+
+async def import_appointments(lines: AsyncIterable[Line], chunk_size: int = IMPORT_CHUNK_SIZE,
+                              check_schedule: bool = True) -> dict:
+    report = ImportReport()
+    snapshot = ScheduleSnapshot(check_schedule)
+
+    async for chunk in iter_chunks(lines, report, chunk_size):
+        valid: List[Tuple[int, dict]] = []
+        for line_number, row in chunk:
+            # ObjectId(None) would mint a fresh id, so a missing doctor_id must be caught first
+            if not row.get("doctor_id"):
+                report.fail(line_number, "doctor_id: required")
+                continue
+            try:
+                doctor_id = ObjectId(row["doctor_id"])
+            except (InvalidId, TypeError):
+                report.fail(line_number, "doctor_id: invalid")
+                continue
+            try:
+                appointment = AppointmentCreate(**row).model_dump(mode="json")
+            except ValidationError as e:
+                report.fail(line_number, _validation_message(e))
+                continue
+            appointment["_id"] = ObjectId()
+            appointment["doctor_id"] = doctor_id
+            appointment.update(minute_fields(appointment["start_time"], appointment["end_time"]))
+            try:
+                check_aligned(appointment["start_minute"], appointment["end_minute"])
+            except ValueError as e:
+                report.fail(line_number, f"start_time/end_time: {e}")
+                continue
+            valid.append((line_number, appointment))
+
+        await snapshot.load([appointment for _, appointment in valid])
+
+        accepted: List[Tuple[int, dict]] = []
+        for line_number, appointment in valid:
+            reason = snapshot.check(appointment)
+            if reason:
+                report.fail(line_number, reason)
+            else:
+                accepted.append((line_number, appointment))
+
+        kept = await _reserve_chunk(accepted, report)
+        if len(kept) < len(accepted):
+            kept_ids = {appointment["_id"] for _, appointment in kept}
+            for _, appointment in accepted:
+                if appointment["_id"] not in kept_ids:
+                    snapshot.release(appointment)
+        accepted = kept
+
+        now = datetime.now()
+        operations, line_numbers = [], []
+        for line_number, appointment in accepted:
+            appointment["created_at"] = now
+            appointment["updated_at"] = now
+            operations.append(InsertOne(appointment))
+            line_numbers.append(line_number)
+        inserted, failed = await _bulk_insert(appointments_collection, operations, line_numbers, report)
+        report.inserted += inserted
+        if failed:
+            # Don't leave slots claimed, or intervals held in the snapshot, by rows that were not written
+            failed_ids = []
+            for index in failed:
+                appointment = accepted[index][1]
+                snapshot.release(appointment)
+                failed_ids.append(appointment["_id"])
+            await reservations_collection.delete_many({"appointment_id": {"$in": failed_ids}})
+
+    return report.as_dict()
+
+
+async def _reserve_chunk(accepted: List[Tuple[int, dict]], report: ImportReport) -> List[Tuple[int, dict]]:
+    """Claim reservation slots for the chunk's active rows in one unordered write; drop rows that lost a slot"""
+    documents, owners = [], []
+    for line_number, appointment in accepted:
+        if appointment["status"] in INACTIVE_STATUSES:
+            continue
+        for slot in slot_keys(appointment["start_time"], appointment["end_time"]):
+            documents.append({
+                "doctor_id": appointment["doctor_id"],
+                "date": appointment["appointment_date"],
+                "slot": slot,
+                "appointment_id": appointment["_id"],
+            })
+            owners.append(appointment["_id"])
+    if not documents:
+        return accepted
+
+    try:
+        await reservations_collection.insert_many(documents, ordered=False)
+        return accepted
+    except BulkWriteError as e:
+        # Booked by someone else since the snapshot was taken
+        lost = {owners[error["index"]] for error in e.details.get("writeErrors", [])}
+
+    await reservations_collection.delete_many({"appointment_id": {"$in": list(lost)}})
+    kept = []
+    for line_number, appointment in accepted:
+        if appointment["_id"] in lost:
+            report.fail(line_number, "This time slot is already booked")
+        else:
+            kept.append((line_number, appointment))
+    return kept
+
+
+async def _bulk_insert(collection, operations: list, line_numbers: List[int],
+                       report: ImportReport) -> Tuple[int, List[int]]:
+    """Unordered bulk insert; returns the inserted count and the indexes of failed operations"""
+    if not operations:
+        return 0, []
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        return result.inserted_count, []
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        for error in write_errors:
+            report.fail(line_numbers[error["index"]], error["errmsg"])
+        return e.details.get("nInserted", 0), [error["index"] for error in write_errors]
@@ -0,0 +1,189 @@
+import asyncio
+import copy
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set, Union
+
+from bson import ObjectId
+
+from app.config import (
+    DOCTOR_CACHE_INVALIDATOR,
+    DOCTOR_CACHE_POLL_INTERVAL,
+    DOCTOR_CACHE_POLL_MAX_BACKOFF,
+    DOCTOR_CACHE_SIZE,
+    DOCTOR_CACHE_TTL,
+)
+from app.database import doctors_collection
+from app.services.doctor_search import doctor_search_index
+from app.services.prompt_builder import invalidate_prompt_cache
+from app.services.schedule_index import WeeklySchedule
+from app.services.shared_state import WORKER_ID, shared_store
+
+
+class DoctorCache:
+    """LRU + TTL cache of doctor documents keyed by ObjectId.
+
+    Concurrent misses for the same doctor share a single Mongo load. Callers
+    get a deep copy, so mutating the result never leaks into the cache.
+    Each entry also carries the doctor's precomputed WeeklySchedule.
+    """
+
+    def __init__(self, max_size: int = DOCTOR_CACHE_SIZE, ttl: float = DOCTOR_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[ObjectId, tuple]" = OrderedDict()
+        self._inflight: Dict[ObjectId, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, doctor_id: Union[str, ObjectId]) -> Optional[dict]:
+        key = ObjectId(doctor_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[1])
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._inflight[key] = task
+        # Shield so one cancelled caller does not cancel the load for the others
+        doctor = await asyncio.shield(task)
+        return copy.deepcopy(doctor) if doctor is not None else None
+
+    def schedule_for(self, doctor: dict) -> WeeklySchedule:
+        """The cached schedule index for a doctor document, built on the spot if it is not cached"""
+        entry = self._entries.get(doctor.get("_id"))
+        # get() hands out copies, so compare by value; a caller that edited the availability gets a fresh index
+        if entry is not None and entry[1].get("availability") == doctor.get("availability"):
+            return entry[2]
+        return WeeklySchedule(doctor.get("availability", []))
+
+    def invalidate(self, doctor_id: Union[str, ObjectId]):
+        key = ObjectId(doctor_id)
+        self._entries.pop(key, None)
+        # A load that started before the write must not repopulate the cache
+        self._inflight.pop(key, None)
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    async def _load(self, key: ObjectId) -> Optional[dict]:
+        current = asyncio.current_task()
+        try:
+            doctor = await doctors_collection.find_one({"_id": key})
+        finally:
+            still_current = self._inflight.get(key) is current
+            if still_current:
+                del self._inflight[key]
+
+        if doctor is not None and still_current and self.max_size > 0:
+            schedule = WeeklySchedule(doctor.get("availability", []))
+            self._entries[key] = (time.monotonic() + self.ttl, doctor, schedule)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return doctor
+
+
+doctor_cache = DoctorCache()
+
+INVALIDATION_CHANNEL = "doctor_invalidations"
+_publishing: Set[asyncio.Task] = set()
+
+
+def _invalidate_local(doctor_id: Union[str, ObjectId, None] = None):
+    if doctor_id is None:
+        doctor_cache.clear()
+    else:
+        doctor_cache.invalidate(doctor_id)
+    doctor_search_index.mark_dirty(doctor_id)
+    invalidate_prompt_cache()
+
+
+def invalidate_doctor(doctor_id: Union[str, ObjectId, None] = None):
+    """Single hook for doctor writes: drops the cached document (all of them if no id), the prompt and the search entry"""
+    _invalidate_local(doctor_id)
+    if DOCTOR_CACHE_INVALIDATOR == "pubsub":
+        # Fire and forget; a lost message only costs staleness up to the cache TTL
+        message = json.dumps({"worker": WORKER_ID, "doctor_id": str(doctor_id) if doctor_id is not None else None})
+        task = asyncio.create_task(shared_store.publish(INVALIDATION_CHANNEL, message))
+        _publishing.add(task)
+        task.add_done_callback(_publishing.discard)
+
+
+async def _listen_for_invalidations():
+    async for raw in shared_store.subscribe(INVALIDATION_CHANNEL):
+        message = json.loads(raw)
+        if message["worker"] != WORKER_ID:
+            _invalidate_local(message["doctor_id"])
+
+
+async def _watch_change_stream():
+    async with doctors_collection.watch() as stream:
+        async for change in stream:
+            key = change.get("documentKey", {}).get("_id")
+            invalidate_doctor(key)
+
+
+async def _latest_update() -> datetime:
+    # The watermark comes from the stored stamps, never this worker's clock
+    latest = await doctors_collection.find_one({"updated_at": {"$ne": None}}, {"updated_at": 1}, sort=[("updated_at", -1)])
+    return latest["updated_at"] if latest else datetime.min
+
+
+async def _poll_for_changes():
+    # Deletes are not visible to polling; the cache TTL bounds how long they linger
+    last_seen = None
+    failures = 0
+    while True:
+        try:
+            if last_seen is None:
+                last_seen = await _latest_update()
+            else:
+                cursor = doctors_collection.find({"updated_at": {"$gt": last_seen}}, {"updated_at": 1})
+                async for doctor in cursor:
+                    invalidate_doctor(doctor["_id"])
+                    last_seen = max(last_seen, doctor["updated_at"])
+            failures = 0
+        except Exception as e:
+            failures = min(failures + 1, 10)
+            print(f"[Doctor Cache] Polling failed ({e}), retrying")
+        await asyncio.sleep(min(DOCTOR_CACHE_POLL_INTERVAL * 2 ** failures, DOCTOR_CACHE_POLL_MAX_BACKOFF))
+
+
+async def run_cache_invalidator(mode: str = DOCTOR_CACHE_INVALIDATOR):
+    """Keep the cache coherent with writes made by other workers ("change_stream", "poll", "pubsub" or "none")"""
+    if mode == "pubsub":
+        await _listen_for_invalidations()
+        return
+    if mode == "change_stream":
+        try:
+            await _watch_change_stream()
+            return
+        except Exception as e:
+            # Change streams need a replica set; fall back to polling on standalone servers
+            print(f"[Doctor Cache] Change stream unavailable ({e}), polling instead")
+            mode = "poll"
+    if mode == "poll":
+        await _poll_for_changes()
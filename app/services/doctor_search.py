@@ -0,0 +1,223 @@
+import asyncio
+import re
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Set, Union
+
+from bson import ObjectId
+
+from app.config import DOCTOR_SEARCH_LIMIT, DOCTOR_SEARCH_MIN_SCORE, DOCTOR_SEARCH_SKELETON_WEIGHT, DOCTOR_SEARCH_TTL
+from app.database import doctors_collection
+
+# Only what the index needs; the tool answers with id, name and specialization
+SEARCH_PROJECTION = {"name": 1, "specialization": 1}
+
+_DIACRITICS = re.compile("[\u0610-\u061a\u0640\u064b-\u065f\u0670\u06d6-\u06ed]")  # harakat, Quranic marks, tatweel
+_NON_WORD = re.compile(r"[^\w]+")
+_ARABIC_FOLDS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه", "ء": "",
+})
+
+# Words callers put in front of a name; they carry no signal and match every doctor
+HONORIFICS = frozenset({"د", "دكتور", "دكتوره", "الدكتور", "الدكتوره", "دكتر", "dr", "doctor", "doc"})
+
+# Patients name the specialization in Arabic, the documents store the English enum value
+SPECIALIZATION_ALIASES = {
+    "General Dentist": ["طبيب اسنان عام", "اسنان عام"],
+    "Oral Surgeon": ["جراح فم", "جراحه فم وفكين"],
+    "Pediatric Dentist": ["طبيب اسنان اطفال", "اسنان اطفال"],
+}
+
+# Arabic letters to a rough Latin spelling, so "Ahmed" and "احمد" share a skeleton
+_TO_LATIN = str.maketrans({
+    "ا": "a", "ب": "b", "ت": "t", "ث": "th", "ج": "g", "ح": "h", "خ": "kh", "د": "d",
+    "ذ": "z", "ر": "r", "ز": "z", "س": "s", "ش": "sh", "ص": "s", "ض": "d", "ط": "t",
+    "ظ": "z", "ع": "a", "غ": "gh", "ف": "f", "ق": "k", "ك": "k", "ل": "l", "م": "m",
+    "ن": "n", "ه": "h", "و": "w", "ي": "y",
+})
+# Latin spellings of the same sound collapse to one letter
+_LATIN_FOLDS = [("ou", "w"), ("oo", "w"), ("ee", "y"), ("j", "g"), ("q", "k"), ("c", "k"), ("dh", "z"), ("th", "t")]
+_LEADING_VOWELS = "aeiou"
+_VOWELS = re.compile(r"(?<=.)[aeiouwy]")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def normalize(text: str) -> str:
+    """Fold Arabic letter variants and diacritics, lowercase Latin, keep words separated by single spaces"""
+    text = _DIACRITICS.sub("", text).translate(_ARABIC_FOLDS).lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def skeleton(token: str) -> str:
+    """Script-independent consonant skeleton of a normalized token ("ahmed", "احمد" -> "ahmd")"""
+    latin = token.translate(_TO_LATIN)
+    for spelling, letter in _LATIN_FOLDS:
+        latin = latin.replace(spelling, letter)
+    if latin[:1] in _LEADING_VOWELS:
+        latin = "a" + latin[1:]
+    # Short vowels are not written in Arabic, so drop every vowel after the first letter
+    latin = _REPEATS.sub(r"\1", _VOWELS.sub("", latin))
+    # Ta marbuta is spelled with or without a final "h" ("Fatma", "Fatmah")
+    return latin[:-1] if len(latin) > 2 and latin.endswith("h") else latin
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in normalize(text).split() if token not in HONORIFICS]
+
+
+def trigrams(token: str, pad: str = " ") -> FrozenSet[str]:
+    padded = f"{pad}{pad}{token}{pad}"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _token_forms(token: str) -> List[FrozenSet[str]]:
+    # Skeletons use their own padding so they only ever match other skeletons
+    return [trigrams(token), trigrams(skeleton(token), pad="~")]
+
+
+def _dice(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class DoctorSearchIndex:
+    """In-process trigram index over doctor names and specializations.
+
+    Candidates come from an inverted trigram index; each query token is scored
+    against the doctor's best matching token (Dice over trigrams on the
+    normalized spelling, or on the Latin skeleton discounted by
+    ``skeleton_weight``) and the token scores averaged. Doctor writes mark ids
+    dirty and the next search reloads just those; every ``ttl`` seconds the
+    next search reloads everything.
+    """
+
+    def __init__(self, limit: int = DOCTOR_SEARCH_LIMIT, min_score: float = DOCTOR_SEARCH_MIN_SCORE,
+                 skeleton_weight: float = DOCTOR_SEARCH_SKELETON_WEIGHT, ttl: float = DOCTOR_SEARCH_TTL):
+        self.limit = limit
+        self.min_score = min_score
+        self.skeleton_weight = skeleton_weight
+        self.ttl = ttl
+        self._doctors: Dict[ObjectId, dict] = {}
+        self._tokens: Dict[ObjectId, List[List[FrozenSet[str]]]] = {}
+        self._postings: Dict[str, Set[ObjectId]] = defaultdict(set)
+        self._dirty: Set[ObjectId] = set()
+        self._stale = True
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+        self.searches = 0
+        self.refreshes = 0
+        self.last_search_ms = 0.0
+
+    def mark_dirty(self, doctor_id: Union[str, ObjectId, None] = None):
+        if doctor_id is None:
+            self._stale = True
+        else:
+            self._dirty.add(ObjectId(doctor_id))
+
+    def upsert(self, doctor: dict):
+        key = doctor["_id"]
+        self.remove(key)
+        specialization = doctor.get("specialization", "")
+        texts = [doctor.get("name", ""), specialization, *SPECIALIZATION_ALIASES.get(specialization, [])]
+        tokens = [_token_forms(token) for text in texts for token in tokenize(text)]
+
+        self._doctors[key] = {"id": str(key), "name": doctor.get("name"), "specialization": specialization}
+        self._tokens[key] = tokens
+        for forms in tokens:
+            for grams in forms:
+                for gram in grams:
+                    self._postings[gram].add(key)
+
+    def remove(self, doctor_id: ObjectId):
+        tokens = self._tokens.pop(doctor_id, None)
+        self._doctors.pop(doctor_id, None)
+        for forms in tokens or []:
+            for grams in forms:
+                for gram in grams:
+                    postings = self._postings.get(gram)
+                    if postings is not None:
+                        postings.discard(doctor_id)
+                        if not postings:
+                            del self._postings[gram]
+
+    def _expired(self) -> bool:
+        return self.ttl > 0 and time.monotonic() - self._loaded_at >= self.ttl
+
+    async def refresh(self):
+        """Apply pending changes: a full reload when stale or past the TTL, otherwise only the dirty ids"""
+        async with self._lock:
+            if self._stale or self._expired():
+                self._stale = False
+                self._loaded_at = time.monotonic()
+                self._dirty.clear()
+                doctors = [doctor async for doctor in doctors_collection.find({}, SEARCH_PROJECTION)]
+                self._doctors.clear()
+                self._tokens.clear()
+                self._postings.clear()
+                for doctor in doctors:
+                    self.upsert(doctor)
+                self.refreshes += 1
+            elif self._dirty:
+                ids, self._dirty = list(self._dirty), set()
+                found = set()
+                async for doctor in doctors_collection.find({"_id": {"$in": ids}}, SEARCH_PROJECTION):
+                    self.upsert(doctor)
+                    found.add(doctor["_id"])
+                for key in ids:
+                    if key not in found:
+                        self.remove(key)
+                self.refreshes += 1
+
+    def search_loaded(self, query: str, limit: Optional[int] = None) -> List[dict]:
+        """Rank the indexed doctors for a query without touching Mongo"""
+        started = time.perf_counter()
+        query_tokens = [_token_forms(token) for token in tokenize(query)]
+        candidates: Set[ObjectId] = set()
+        for forms in query_tokens:
+            for grams in forms:
+                for gram in grams:
+                    candidates.update(self._postings.get(gram, ()))
+
+        scored = []
+        for key in candidates:
+            doctor_tokens = self._tokens[key]
+            total = 0.0
+            for query_exact, query_skeleton in query_tokens:
+                total += max(
+                    (
+                        max(_dice(query_exact, exact), self.skeleton_weight * _dice(query_skeleton, skeleton_grams))
+                        for exact, skeleton_grams in doctor_tokens
+                    ),
+                    default=0.0,
+                )
+            score = total / len(query_tokens)
+            if score >= self.min_score:
+                scored.append((score, key))
+
+        scored.sort(key=lambda item: (-item[0], self._doctors[item[1]]["name"] or ""))
+        self.searches += 1
+        self.last_search_ms = (time.perf_counter() - started) * 1000
+        return [
+            {**self._doctors[key], "score": round(score, 3)}
+            for score, key in scored[: limit or self.limit]
+        ]
+
+    async def search(self, query: str, limit: Optional[int] = None) -> List[dict]:
+        if self._stale or self._dirty or self._expired():
+            await self.refresh()
+        return self.search_loaded(query, limit)
+
+    def stats(self) -> Dict[str, Optional[Union[int, float]]]:
+        return {
+            "doctors": len(self._doctors),
+            "trigrams": len(self._postings),
+            "searches": self.searches,
+            "refreshes": self.refreshes,
+            "age_s": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "last_search_ms": round(self.last_search_ms, 3),
+        }
+
+
+doctor_search_index = DoctorSearchIndex()
+
@@ -0,0 +1,98 @@
+import asyncio
+import random
+from typing import TYPE_CHECKING, Optional
+
+from app.config import (
+    OPENAI_HTTP2,
+    OPENAI_HTTP_CONNECT_TIMEOUT,
+    OPENAI_HTTP_KEEPALIVE_EXPIRY,
+    OPENAI_HTTP_MAX_CONNECTIONS,
+    OPENAI_HTTP_MAX_KEEPALIVE,
+    OPENAI_HTTP_READ_TIMEOUT,
+    OPENAI_HTTP_RETRIES,
+    OPENAI_HTTP_RETRY_BACKOFF,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  # type: ignore
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client() -> "httpx.AsyncClient":
+    """Build the pooled client used for every upstream OpenAI HTTP call"""
+    # Deferred so importing the app does not pay for httpx until the client is built
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=OPENAI_HTTP2 and _http2_available(),
+        limits=httpx.Limits(
+            max_connections=OPENAI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            OPENAI_HTTP_READ_TIMEOUT,
+            connect=OPENAI_HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+async def start_http_client():
+    global _client
+    if _client is None:
+        _client = create_http_client()
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    # Normally opened by the app lifespan; fall back to a lazy client for scripts
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+
+def _retry_delay(attempt: int, response: Optional["httpx.Response"]) -> float:
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    # Full jitter: spread retries from concurrent sessions instead of synchronising them
+    return random.uniform(0, OPENAI_HTTP_RETRY_BACKOFF * (2 ** attempt))
+
+
+async def post_with_retry(url: str, **kwargs) -> "httpx.Response":
+    """POST on the shared client, retrying 429/5xx and transport errors with jittered backoff"""
+    import httpx
+
+    client = get_http_client()
+    for attempt in range(OPENAI_HTTP_RETRIES + 1):
+        response = None
+        try:
+            response = await client.post(url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+        except httpx.TransportError:
+            if attempt == OPENAI_HTTP_RETRIES:
+                raise
+
+        if attempt == OPENAI_HTTP_RETRIES:
+            return response
+        await asyncio.sleep(_retry_delay(attempt, response))
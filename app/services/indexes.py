@@ -0,0 +1,112 @@
+import asyncio
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.database import appointments_collection, doctors_collection, reservations_collection
+from app.services.availability import INACTIVE_STATUSES, overlap_filter
+
+# Every index the routes, tools and reservations rely on, declared in one place
+INDEXES = {
+    doctors_collection: [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("specialization", ASCENDING)], name="specialization"),
+        # Keyset pagination orders: (sort key, _id)
+        IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)], name="created_at_id"),
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)], name="name_id"),
+        # Cache invalidation polling (DOCTOR_CACHE_INVALIDATOR=poll)
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    appointments_collection: [
+        # Overlap checks (start_minute < end AND end_minute > start) and availability range queries
+        IndexModel(
+            [("doctor_id", ASCENDING), ("appointment_date", ASCENDING), ("start_minute", ASCENDING), ("end_minute", ASCENDING)],
+            name="doctor_date_start_end_minute",
+        ),
+        IndexModel([("patient_email", ASCENDING), ("appointment_date", ASCENDING)], name="patient_email_date"),
+        IndexModel([("appointment_date", ASCENDING), ("_id", ASCENDING)], name="appointment_date_id"),
+        IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)], name="created_at_id"),
+    ],
+    reservations_collection: [
+        # The unique index is what makes two concurrent bookings of one slot impossible
+        IndexModel([("doctor_id", ASCENDING), ("date", ASCENDING), ("slot", ASCENDING)], unique=True, name="doctor_date_slot_unique"),
+        IndexModel([("appointment_id", ASCENDING)], name="appointment_id"),
+    ],
+}
+
+
+async def ensure_indexes():
+    """Create the declared indexes; existing identical indexes are left alone, so this is safe on every start"""
+    for collection, models in INDEXES.items():
+        try:
+            await collection.create_indexes(models)
+        except OperationFailure as e:
+            # e.g. an index with the same name but different options was created by hand
+            print(f"[Indexes] Could not create indexes on {collection.name}: {e}")
+
+
+def query_shapes() -> List[Dict[str, Any]]:
+    """Representative filters for every query the app issues, used to check their plans"""
+    doctor_id = ObjectId()
+    today = date.today().isoformat()
+    return [
+        {"name": "doctor by email", "collection": doctors_collection, "filter": {"email": "x@example.com"}},
+        {"name": "doctors by specialization", "collection": doctors_collection, "filter": {"specialization": "General Dentist"}},
+        {"name": "doctors changed since", "collection": doctors_collection, "filter": {"updated_at": {"$gt": datetime(2024, 1, 1)}}},
+        {
+            "name": "appointment overlap",
+            "collection": appointments_collection,
+            "filter": {
+                "doctor_id": doctor_id,
+                "appointment_date": today,
+                "status": {"$nin": INACTIVE_STATUSES},
+                **overlap_filter(600, 630),
+            },
+        },
+        {
+            "name": "availability range",
+            "collection": appointments_collection,
+            "filter": {"doctor_id": doctor_id, "appointment_date": {"$gte": today, "$lte": today}, "status": {"$nin": INACTIVE_STATUSES}},
+        },
+        {"name": "appointments by doctor", "collection": appointments_collection, "filter": {"doctor_id": doctor_id}},
+        {"name": "appointments by patient", "collection": appointments_collection, "filter": {"patient_email": "x@example.com"}},
+        {"name": "appointments by date", "collection": appointments_collection, "filter": {"appointment_date": today}},
+        {"name": "reservations by appointment", "collection": reservations_collection, "filter": {"appointment_id": ObjectId()}},
+    ]
+
+
+def _stages(plan: Dict[str, Any]):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def find_collection_scans() -> List[str]:
+    """Names of the query shapes whose winning plan contains a COLLSCAN"""
+    scans = []
+    for shape in query_shapes():
+        explanation = await shape["collection"].find(shape["filter"]).explain()
+        if "COLLSCAN" in _stages(explanation["queryPlanner"]["winningPlan"]):
+            scans.append(shape["name"])
+    return scans
+
+
+async def _main():
+    await ensure_indexes()
+    scans = await find_collection_scans()
+    for name in scans:
+        print(f"[Indexes] COLLSCAN: {name}")
+    print(f"[Indexes] {len(query_shapes()) - len(scans)}/{len(query_shapes())} query shapes use an index")
+    return 1 if scans else 0
+
+
+if __name__ == "__main__":
+    # python -m app.services.indexes: create indexes, exit non-zero if any query shape scans the collection
+    sys.exit(asyncio.run(_main()))
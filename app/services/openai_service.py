@@ -1,18 +1,31 @@
-import datetime
-from typing import Optional
-from bson import ObjectId
-import httpx
+from typing import Optional, Set
 from fastapi import HTTPException, WebSocket
 import json
 import asyncio
-import websockets
+import time
 
-from app.endpoints.appoinments_routes import check_doctor_availability, get_doctor_or_404
-from ..config import ARABIC_SYSTEM_PROMPT, OPENAI_API_KEY
-from app.database import doctors_collection ,appointments_collection
+from ..config import (
+    CLIENT_BUFFER_HIGH_WATERMARK,
+    CLIENT_BUFFER_LOW_WATERMARK,
+    CLIENT_DROPPABLE_EVENT_TYPES,
+    OPENAI_API_BASE,
+    OPENAI_API_KEY,
+    UPSTREAM_BUFFER_HIGH_WATERMARK,
+    UPSTREAM_BUFFER_LOW_WATERMARK,
+)
+from app.services.http_client import post_with_retry
+from app.services.audio import audio_delta_to_pcm16, pcm16_to_append_event
+from app.services.buffers import FrameBuffer
+from app.services.prompt_builder import get_system_prompt
+from app.services.query_profiler import redact
+from app.services.telemetry import SessionTrace
+from app.services.tool_executor import ToolExecutor
+from app.services.tools import TOOL_DEFINITIONS, run_tool
 
 async def create_openai_session(model, voice, system_prompt=None):
     """Create an ephemeral session token for WebRTC client use"""
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=503, detail="OPENAI_API_KEY is not configured")
     try:
         # Prepare request payload
         payload = {
@@ -24,185 +37,191 @@ async def create_openai_session(model, voice, system_prompt=None):
         if system_prompt:
             payload["instructions"] = system_prompt
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/realtime/sessions",
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json=payload
-            )
+        response = await post_with_retry(
+            f"{OPENAI_API_BASE}/realtime/sessions",
+            headers={
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
             
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
-                
-            return response.json()
+        return response.json()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-# Sample data to inject into prompt
-doctors = [
-    {
-        "id": "60d5ec49fbd8621e4023a7b1",
-        "name": "دكتور أحمد",
-        "specialization": "ORTHODONTICS",
-        "availability": [
-            {
-                "day_of_week": 0,  # Monday
-                "time_slots": [
-                    {"start_time": "09:00:00", "end_time": "12:00:00"},
-                    {"start_time": "13:00:00", "end_time": "17:00:00"}
-                ]
-            },
-            {
-                "day_of_week": 2,  # Wednesday
-                "time_slots": [
-                    {"start_time": "10:00:00", "end_time": "18:00:00"}
-                ]
-            }
-        ]
-    },
-    {
-        "id": "60d5ec49fbd8621e4023a7b2",
-        "name": "دكتورة سارة",
-        "specialization": "PROSTHODONTICS",
-        "availability": [
-            {
-                "day_of_week": 1,  # Tuesday
-                "time_slots": [
-                    {"start_time": "08:00:00", "end_time": "16:00:00"}
-                ]
-            },
-            {
-                "day_of_week": 4,  # Friday
-                "time_slots": [
-                    {"start_time": "09:00:00", "end_time": "12:00:00"},
-                    {"start_time": "13:00:00", "end_time": "15:00:00"}
-                ]
-            }
-        ]
-    },
-    {
-        "id": "60d5ec49fbd8621e4023a7b3",
-        "name": "دكتور محمد",
-        "specialization": "ENDODONTICS",
-        "availability": [
-            {
-                "day_of_week": 3,  # Thursday
-                "time_slots": [
-                    {"start_time": "10:00:00", "end_time": "14:00:00"}
-                ]
-            },
-            {
-                "day_of_week": 5,  # Saturday
-                "time_slots": [
-                    {"start_time": "09:00:00", "end_time": "13:00:00"}
-                ]
-            }
-        ]
-    }
-]
-
-appointments = [
-    # Doctor Ahmed - Monday (Booked)
-    {
-        "doctor_id": "60d5ec49fbd8621e4023a7b1",
-        "patient_email": "john@example.com",
-        "appointment_date": "2025-04-07",  # Monday
-        "start_time": "10:00:00",
-        "end_time": "10:30:00",
-        "status": "confirmed"
-    },
-    # Doctor Sara - Friday (Booked)
-    {
-        "doctor_id": "60d5ec49fbd8621e4023a7b2",
-        "patient_email": "jane@example.com",
-        "appointment_date": "2025-04-11",  # Friday
-        "start_time": "10:00:00",
-        "end_time": "10:30:00",
-        "status": "confirmed"
-    },
-    # Doctor Mohamed - Thursday (Booked)
-    {
-        "doctor_id": "60d5ec49fbd8621e4023a7b3",
-        "patient_email": "mike@example.com",
-        "appointment_date": "2025-04-10",  # Thursday
-        "start_time": "11:00:00",
-        "end_time": "11:30:00",
-        "status": "confirmed"
-    }
-]
-
-
-ARABIC_SYSTEM_PROMPT = f"""
-أنت مساعد طبي ذكي يتحدث باللهجة المصرية العامية، مهمتك هي مساعدة المرضى في حجز المواعيد الطبية بطريقة سهلة وودية. أنت متصل مباشرة بقاعدة بيانات الأطباء والمواعيد المتاحة.
-
-### مهماتك الأساسية:
-- فهم اسم الطبيب المفضل من المريض وتاريخ ووقت الحجز المرغوب فيه.
-- التحقق من توفر الطبيب في قابة البيانات: إذا كان موجود أم لا.
-- عرض الجدول الزمني لكل طبيب بناءً على يوم الحجز.
-- إذا كان الوقت متاحًا، اعرض الخيارات للمريض واطلب تأكيد الحجز.
-- بعد موافقة المريض، احجز الموعد بشكل رسمي عن طريق تحديث قاعدة البيانات.
-- إذا لم يكن هناك وقت متاح أو الطبيب غير موجود، اقترح أطباء آخرين أو أيام أخرى.
-- استخدم دائمًا لهجتنا العامية البسيطة مثل: "إزيك"، "عامل إيه"، "إن شاء الله"، "الحمد لله".
-- كن لطيفًا ومتعاطفًا مع المرضى، خاصة إذا كانوا قلقين.
-- تاكد ان تحجز فقط المواعيد المتاحة و الاطباء المتوفرين في بيانات الاطباء و بيانات المواعيد
-### بيانات الأطباء:
-{doctors}
-
-### بيانات المواعيد:
-{appointments}
-"""
-
-TOOL_DEFINITIONS = [
-    {
-        "type": "function",
-        "name": "search_doctor_by_name",
-        "description": "ابحث عن الأطباء باستخدام الاسم أو التخصص.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "name": {"type": "string", "description": "الاسم أو التخصص الذي يبحث عنه المريض"}
-            },
-            "required": ["name"]
-        }
-    },
-    {
-        "type": "function",
-        "name": "get_doctor_availability",
-        "description": "اعرض الجدول الزمني لطبيب في يوم معين.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "doctor_id": {"type": "string"},
-                "date": {"type": "string", "format": "date"}
-            },
-            "required": ["doctor_id", "date"]
-        }
-    },
-    {
-        "type": "function",
-        "name": "book_appointment",
-        "description": "احجز موعدًا بعد تأكيد المريض.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-              
-                "patient_email": {"type": "string"},
-                "doctor_id": {"type": "string"},
-                "patient_name": {"type": "string"},
-                "appointment_date": {"type": "string", "format": "date"},
-                "start_time": {"type": "string", "format": "time"},
-                "end_time": {"type": "string", "format": "time"}
-            },
-            "required": ["doctor_id", "patient_email", "appointment_date", "start_time", "end_time"]
+def tool_output_frame(call_id: str, content: dict) -> str:
+    """Frame that returns a tool result to the model"""
+    return json.dumps({
+        "type": "conversation.item.create",
+        "item": {
+            "type": "function_call_output",
+            "call_id": call_id,
+            # Mongo documents carry ObjectId/datetime values
+            "output": json.dumps(content, default=str, ensure_ascii=False)
         }
-    }
-]
+    })
+
+
+RESPONSE_CREATE_FRAME = json.dumps({"type": "response.create"})
+
+
+class RealtimeSession:
+    """Per-connection state shared by the upstream event handlers.
+
+    Each direction goes through its own bounded FrameBuffer, drained by a
+    dedicated writer task, so a slow peer only ever fills its own buffer.
+
+    Tool results are sent as soon as they are ready, but the follow-up
+    ``response.create`` waits until the response that asked for them is done
+    and every one of its calls has been answered: the Realtime API rejects a
+    second response while one is still active.
+    """
+
+    def __init__(self, websocket: WebSocket, openai_ws, trace: SessionTrace, binary_audio: bool = False):
+        self.websocket = websocket
+        self.openai_ws = openai_ws
+        # Opt-in: exchange audio with the browser as raw PCM16 binary frames
+        self.binary_audio = binary_audio
+        self.trace = trace
+        self.tool_executor = ToolExecutor(run_tool, self.send_tool_output, trace=self.trace)
+        self.to_client = FrameBuffer(
+            "to_client",
+            CLIENT_BUFFER_HIGH_WATERMARK,
+            CLIENT_BUFFER_LOW_WATERMARK,
+            droppable_types=CLIENT_DROPPABLE_EVENT_TYPES,
+        )
+        self.to_upstream = FrameBuffer(
+            "to_upstream",
+            UPSTREAM_BUFFER_HIGH_WATERMARK,
+            UPSTREAM_BUFFER_LOW_WATERMARK,
+        )
+        self.response_active = False
+        self.pending_calls: Set[str] = set()
+        self.needs_response = False
+
+    async def send_tool_output(self, call_id: str, content: dict):
+        await self.to_upstream.put(tool_output_frame(call_id, content))
+        self.pending_calls.discard(call_id)
+        self.needs_response = True
+        await self.request_response_if_ready()
+
+    async def request_response_if_ready(self):
+        if self.needs_response and not self.response_active and not self.pending_calls:
+            # Cleared before awaiting so concurrent results cannot send a second one
+            self.needs_response = False
+            await self.to_upstream.put(RESPONSE_CREATE_FRAME)
+
+    async def pump_to_client(self):
+        while True:
+            frame = await self.to_client.get()
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+
+    async def pump_to_upstream(self):
+        while True:
+            await self.openai_ws.send(await self.to_upstream.get())
+
+    def buffer_stats(self):
+        return {"to_client": self.to_client.stats(), "to_upstream": self.to_upstream.stats()}
+
+
+# Upstream event handlers. Each one receives the raw frame (forwarded as-is,
+# no re-serialization) and the event parsed exactly once by the router.
+async def forward_to_client(session: RealtimeSession, message: str, event: dict):
+    await session.to_client.put(message, event.get("type"))
 
 
-async def connect_to_openai_websocket(websocket: WebSocket, model: str, system_prompt: Optional[str] = None):
+async def forward_audio_delta(session: RealtimeSession, message: str, event: dict):
+    session.trace.audio_delta()
+    if not session.binary_audio:
+        await forward_to_client(session, message, event)
+        return
+    await session.to_client.put(audio_delta_to_pcm16(event["delta"]), event["type"])
+
+
+async def handle_function_call(session: RealtimeSession, message: str, event: dict):
+    # The browser still sees the call in its log, then it is queued so a slow
+    # query never holds up the audio frames behind it
+    await session.to_client.put(message, event.get("type"))
+
+    call_id = event["call_id"]
+    tool_name = event["name"]
+    session.pending_calls.add(call_id)
+
+    try:
+        tool_params = json.loads(event.get("arguments") or "{}")
+    except ValueError as e:
+        print(f"[Tool Call] {tool_name} ({call_id}) with unparseable arguments")
+        await session.send_tool_output(call_id, {"error": f"Invalid arguments: {e}"})
+        return
+    # Arguments carry patient names, emails and phone numbers; log their keys only
+    print(f"[Tool Call] {tool_name} ({call_id}) with params: {redact(tool_params)}")
+
+    await session.tool_executor.submit(call_id, tool_name, tool_params)
+
+
+async def note_session_updated(session: RealtimeSession, message: str, event: dict):
+    session.trace.session_updated()
+    await forward_to_client(session, message, event)
+
+
+async def note_speech_started(session: RealtimeSession, message: str, event: dict):
+    session.trace.speech_started()
+    await forward_to_client(session, message, event)
+
+
+async def note_speech_ended(session: RealtimeSession, message: str, event: dict):
+    session.trace.speech_ended()
+    await forward_to_client(session, message, event)
+
+
+async def note_response_created(session: RealtimeSession, message: str, event: dict):
+    session.response_active = True
+    session.trace.response_created()
+    await forward_to_client(session, message, event)
+
+
+async def note_response_done(session: RealtimeSession, message: str, event: dict):
+    session.response_active = False
+    await forward_to_client(session, message, event)
+    await session.request_response_if_ready()
+
+
+UPSTREAM_EVENT_HANDLERS = {
+    "session.updated": note_session_updated,
+    "input_audio_buffer.speech_started": note_speech_started,
+    "input_audio_buffer.speech_stopped": note_speech_ended,
+    "input_audio_buffer.committed": note_speech_ended,
+    "response.created": note_response_created,
+    "response.done": note_response_done,
+    "response.audio.delta": forward_audio_delta,
+    "response.function_call_arguments.done": handle_function_call,
+}
+
+
+async def route_upstream_events(session: RealtimeSession):
+    """Single reader of the upstream socket: parse each frame once and dispatch it by event type"""
+    async for message in session.openai_ws:
+        try:
+            event = json.loads(message)
+        except ValueError:
+            print("[Router] Dropping non-JSON upstream frame")
+            continue
+
+        handler = UPSTREAM_EVENT_HANDLERS.get(event.get("type"), forward_to_client)
+        await handler(session, message, event)
+
+
+async def connect_to_openai_websocket(websocket: WebSocket, model: str, system_prompt: Optional[str] = None,
+                                      binary_audio: bool = False):
     """Proxy WebSocket connections to the OpenAI Realtime API"""
     openai_ws_url = f"wss://api.openai.com/v1/realtime?model={model}"
     headers = {
@@ -210,120 +229,66 @@ async def connect_to_openai_websocket(websocket: WebSocket, model: str, system_p
         "OpenAI-Beta": "realtime=v1"
     }
 
+    # Deferred: only voice sessions need the websockets client
+    import websockets
+
+    trace = SessionTrace(model)
     try:
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY is not configured")
+        connect_started = time.monotonic()
         async with websockets.connect(openai_ws_url, extra_headers=headers) as openai_ws:
+            trace.upstream_connected(connect_started)
+
             # Step 1: Set session instructions and tools
             session_update = {
                 "type": "session.update",
                 "session": {
-                    "instructions": system_prompt or ARABIC_SYSTEM_PROMPT,
+                    "instructions": system_prompt or await get_system_prompt(),
                     "tools": TOOL_DEFINITIONS,
                     "tool_choice": "auto"
                 }
             }
             await openai_ws.send(json.dumps(session_update))
+            trace.session_update_sent()
 
-            # Step 2: Bi-directional message forwarding
-            async def forward_to_client():
-                while True:
-                    message = await openai_ws.recv()
-                    await websocket.send_text(message)
+            session = RealtimeSession(websocket, openai_ws, trace, binary_audio=binary_audio)
 
+            # Step 2: Client -> upstream forwarding (through the bounded buffer)
             async def forward_to_openai():
                 while True:
-                    message = await websocket.receive_text()
-                    await openai_ws.send(message)
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return
+                    if message.get("bytes") is not None:
+                        # Binary frames are raw PCM16 from the microphone
+                        await session.to_upstream.put(pcm16_to_append_event(message["bytes"]))
+                    else:
+                        await session.to_upstream.put(message["text"])
 
-            # Step 3: Handle tool calls
-            async def handle_tool_calls():
-                while True:
-                    try:
-                        message = await openai_ws.recv()
-                        data = json.loads(message)
-                        
-                        if data.get("type") == "tool_call":
-                            tool_name = data["name"]
-                            tool_params = data["content"]
-                            call_id = data["id"]
-
-                            print(f"[Tool Call] {tool_name} with params: {tool_params}")
-
-                            try:
-                                if tool_name == "search_doctor_by_name":
-                                    name = tool_params["name"]
-                                    cursor = doctors_collection.find({"$text": {"$search": name}})
-                                    results = [doc async for doc in cursor]
-                                    content = {"doctors": results}
-
-                                elif tool_name == "get_doctor_availability":
-                                    doctor_id = tool_params["doctor_id"]
-                                    date_str = tool_params["date"]
-                                    appointment_date = datetime.date.fromisoformat(date_str)
-                                    day_of_week = appointment_date.weekday()
-
-                                    doctor = await get_doctor_or_404(doctor_id)
-                                    schedule = next((s for s in doctor.get("availability", []) if s["day_of_week"] == day_of_week), None)
-                                    
-                                    if not schedule:
-                                        raise Exception(f"Doctor not available on day {day_of_week}")
-                                    
-                                    content = {
-                                        "available_slots": schedule["time_slots"]
-                                    }
-
-                                elif tool_name == "book_appointment":
-                                    doctor_id = tool_params["doctor_id"]
-                                    patient_email = tool_params["patient_email"]
-                                    appointment_date = datetime.date.fromisoformat(tool_params["appointment_date"])
-                                    start_time = datetime.strptime(tool_params["start_time"], "%H:%M:%S").time()
-                                    end_time = datetime.strptime(tool_params["end_time"], "%H:%M:%S").time()
-
-                                    # Check availability
-                                    await check_doctor_availability(doctor_id, appointment_date, start_time, end_time)
-
-                                    # Insert into DB
-                                    result = await appointments_collection.insert_one({
-                                        "doctor_id": ObjectId(doctor_id),
-                                        "patient_email": patient_email,
-                                        "appointment_date": appointment_date.isoformat(),
-                                        "start_time": start_time.isoformat(),
-                                        "end_time": end_time.isoformat(),
-                                        "status": "confirmed",
-                                        "created_at": datetime.now()
-                                    })
-
-                                    content = {"status": "success", "message": "تم الحجز بنجاح!"}
-
-                                else:
-                                    content = {"error": "Unknown tool"}
-
-                            except Exception as e:
-                                content = {"error": str(e)}
-
-                            # Respond to OpenAI
-                            tool_response = {
-                                "type": "tool_response",
-                                "call_id": call_id,
-                                "name": tool_name,
-                                "content": content
-                            }
-                            await openai_ws.send(json.dumps(tool_response))
-
-                    except Exception as e:
-                        print(f"[Error in tool handler]: {e}")
-
-            # Step 4: Run tasks concurrently
-            forward_client_task = asyncio.create_task(forward_to_client())
-            forward_openai_task = asyncio.create_task(forward_to_openai())
-            tool_handler_task = asyncio.create_task(handle_tool_calls())
-
-            done, pending = await asyncio.wait(
-                [forward_client_task, forward_openai_task, tool_handler_task],
-                return_when=asyncio.FIRST_COMPLETED
-            )
-
-            for task in pending:
-                task.cancel()
+            # Step 3: Run both directions concurrently; upstream has exactly one reader
+            session.tool_executor.start()
+            tasks = [
+                asyncio.create_task(route_upstream_events(session)),
+                asyncio.create_task(forward_to_openai()),
+                asyncio.create_task(session.pump_to_client()),
+                asyncio.create_task(session.pump_to_upstream()),
+            ]
+
+            try:
+                done, pending = await asyncio.wait(
+                    tasks,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in pending:
+                    task.cancel()
+            finally:
+                # Client or upstream went away: drop any queued or running tool calls
+                await session.tool_executor.close()
+                print(f"[Proxy] Session closed, buffers: {session.buffer_stats()}")
 
     except Exception as e:
-        await websocket.close(code=1011, reason=f"Connection error: {str(e)}")
\ No newline at end of file
+        await websocket.close(code=1011, reason=f"Connection error: {str(e)}")
+    finally:
+        trace.close()
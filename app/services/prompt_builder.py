@@ -0,0 +1,79 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from app.config import ARABIC_SYSTEM_PROMPT, PROMPT_CACHE_TTL, PROMPT_TOKEN_BUDGET
+from app.database import doctors_collection
+
+DAY_NAMES = ["الاثنين", "الثلاثاء", "الأربعاء", "الخميس", "الجمعة", "السبت", "الأحد"]
+
+PROMPT_TEMPLATE = """{base}- تاكد ان تحجز فقط المواعيد المتاحة و الاطباء المتوفرين في بيانات الاطباء، واستخدم أداة get_doctor_availability لمعرفة المواعيد المحجوزة.
+### بيانات الأطباء (المعرف | الاسم | التخصص | أيام وساعات العمل):
+{doctors}
+"""
+
+# Only what the summary renders; bio, qualifications, contact details stay in Mongo
+DOCTOR_PROJECTION = {"name": 1, "specialization": 1, "availability": 1}
+
+_version = 0
+_cached_version = -1
+_cached_at = 0.0
+_cached_prompt: Optional[str] = None
+_lock = asyncio.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough upper bound for mixed Arabic/English text; good enough for a budget
+    return len(text) // 3 + 1
+
+
+def invalidate_prompt_cache():
+    """Call after any doctor write so the next session sees the new schedule"""
+    global _version
+    _version += 1
+
+
+def _hhmm(value: str) -> str:
+    return value[:5]
+
+
+def render_doctor_line(doctor: dict) -> str:
+    days = []
+    for schedule in sorted(doctor.get("availability", []), key=lambda s: s["day_of_week"]):
+        slots = ",".join(f"{_hhmm(s['start_time'])}-{_hhmm(s['end_time'])}" for s in schedule["time_slots"])
+        days.append(f"{DAY_NAMES[schedule['day_of_week']]} {slots}")
+    return f"- {doctor['_id']} | {doctor['name']} | {doctor['specialization']} | {'؛ '.join(days) or '-'}"
+
+
+def render_prompt(doctors: List[dict], budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Render the prompt, keeping the doctor list inside the token budget"""
+    lines = []
+    used = estimate_tokens(PROMPT_TEMPLATE.format(base=ARABIC_SYSTEM_PROMPT, doctors=""))
+    for index, doctor in enumerate(doctors):
+        line = render_doctor_line(doctor)
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            lines.append(f"- ... و {len(doctors) - index} أطباء آخرين، استخدم أداة search_doctor_by_name للبحث عنهم.")
+            break
+        lines.append(line)
+        used += cost
+    return PROMPT_TEMPLATE.format(base=ARABIC_SYSTEM_PROMPT, doctors="\n".join(lines))
+
+
+async def get_system_prompt() -> str:
+    """Return the default system prompt, rebuilding it only when doctors changed or the TTL expired"""
+    global _cached_version, _cached_at, _cached_prompt
+    if _cached_prompt is not None and _cached_version == _version and time.monotonic() - _cached_at < PROMPT_CACHE_TTL:
+        return _cached_prompt
+
+    async with _lock:
+        # Another session may have rebuilt it while we waited
+        if _cached_prompt is not None and _cached_version == _version and time.monotonic() - _cached_at < PROMPT_CACHE_TTL:
+            return _cached_prompt
+
+        version = _version
+        doctors = [doc async for doc in doctors_collection.find({}, DOCTOR_PROJECTION).sort("name", 1)]
+        _cached_prompt = render_prompt(doctors)
+        _cached_version = version
+        _cached_at = time.monotonic()
+        return _cached_prompt
@@ -0,0 +1,143 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+from app.config import QUERY_PROFILE_MAX_COMMANDS, SLOW_QUERY_MS
+
+QUERY_COUNT_HEADER = "X-Mongo-Queries"
+QUERY_TIME_HEADER = "X-Mongo-Time-Ms"
+QUERY_COMMANDS_HEADER = "X-Mongo-Commands"
+
+
+class QueryProfile:
+    """Mongo commands issued on behalf of one HTTP request or tool call.
+
+    Motor runs commands on executor threads that inherit the caller's context,
+    so the listener finds the profile through a contextvar and appends to it
+    from those threads; hence the lock.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.count = 0
+        self.total_ms = 0.0
+        self.commands: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def add(self, command_name: str, collection: Optional[str], duration_ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            if len(self.commands) < QUERY_PROFILE_MAX_COMMANDS:
+                self.commands.append((command_name, collection, round(duration_ms, 3)))
+
+    def summary(self) -> str:
+        """Compact command list for a debug header, e.g. ``find:doctors=0.41,insert:appointments=1.2``"""
+        return ",".join(f"{name}:{collection}={ms}" for name, collection, ms in self.commands)
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+
+class EndpointQueryStats:
+    """Round trips per route/tool across requests, for budgeting queries per endpoint"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, profile: QueryProfile):
+        with self._lock:
+            stats = self._stats.setdefault(
+                profile.label, {"requests": 0, "queries": 0, "max_queries": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            stats["requests"] += 1
+            stats["queries"] += profile.count
+            stats["max_queries"] = max(stats["max_queries"], profile.count)
+            stats["total_ms"] += profile.total_ms
+            stats["max_ms"] = max(stats["max_ms"], profile.total_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                label: {
+                    "requests": stats["requests"],
+                    "avg_queries": round(stats["queries"] / stats["requests"], 2),
+                    "max_queries": stats["max_queries"],
+                    "avg_ms": round(stats["total_ms"] / stats["requests"], 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                }
+                for label, stats in sorted(self._stats.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+endpoint_query_stats = EndpointQueryStats()
+
+
+@contextmanager
+def profile_queries(label: str):
+    """Attribute every Mongo command issued inside the block to ``label``"""
+    profile = QueryProfile(label)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        endpoint_query_stats.record(profile)
+
+
+def redact(shape: Any) -> Any:
+    """Keep a filter's field names and operators, replace every value with "?" (slow logs must not carry patient data)"""
+    if isinstance(shape, dict):
+        return {key: redact(value) for key, value in shape.items()}
+    if isinstance(shape, (list, tuple)) and any(isinstance(item, (dict, list, tuple)) for item in shape):
+        # $or / $and branches and pipeline stages keep their structure
+        return [redact(item) for item in shape]
+    return "?"
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """Feeds the current QueryProfile and logs commands slower than SLOW_QUERY_MS"""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        # Started events carry the command document, completion events only the duration
+        self._pending: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = event.command
+
+    def succeeded(self, event):
+        self._finish(event, "")
+
+    def failed(self, event):
+        self._finish(event, " (failed)")
+
+    def _finish(self, event, suffix: str):
+        with self._lock:
+            command = self._pending.pop((event.connection_id, event.request_id), None) or {}
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = None
+        duration_ms = event.duration_micros / 1000
+
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add(event.command_name, collection, duration_ms)
+
+        if duration_ms >= self.slow_ms:
+            label = profile.label if profile is not None else "-"
+            shape = command.get("filter") or command.get("q") or command.get("pipeline")
+            print(
+                f"[Slow Query] {duration_ms:.1f}ms {event.command_name} {event.database_name}.{collection} "
+                f"by {label}{suffix} {str(redact(shape))[:200] if shape else ''}"
+            )
@@ -0,0 +1,40 @@
+import ipaddress
+from typing import List, Optional, Union
+
+from fastapi import Request, WebSocket
+
+from app.config import SESSION_RATE_LIMIT, SESSION_RATE_WINDOW, TRUSTED_PROXIES
+from app.services.shared_state import RateLimiter
+
+# Each session mints a paid upstream token, so both /api/sessions and /ws/proxy count against it
+session_rate_limiter = RateLimiter("sessions", SESSION_RATE_LIMIT, SESSION_RATE_WINDOW)
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+_trusted_networks: List[Network] = [ipaddress.ip_network(proxy, strict=False) for proxy in TRUSTED_PROXIES]
+
+
+def _is_trusted(host: str, networks: List[Network]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_key(connection: Union[Request, WebSocket], trusted: Optional[List[Network]] = None) -> str:
+    """Address to rate limit on: the peer, or the client a trusted proxy forwarded for.
+
+    X-Forwarded-For is only read when the peer is one of TRUSTED_PROXIES, and
+    then walked from the right, skipping further trusted hops, so a client
+    cannot pick its own key by sending the header itself.
+    """
+    networks = _trusted_networks if trusted is None else trusted
+    host = connection.client.host if connection.client else "unknown"
+    forwarded = connection.headers.get("x-forwarded-for")
+    if not forwarded or not _is_trusted(host, networks):
+        return host
+    for hop in reversed([hop.strip() for hop in forwarded.split(",")]):
+        if hop and not _is_trusted(hop, networks):
+            return hop
+    return host
@@ -0,0 +1,22 @@
+from typing import Dict
+
+
+class Readiness:
+    """Named startup checks gating /api/ready; /api/health (liveness) never waits for them"""
+
+    def __init__(self):
+        self.checks: Dict[str, bool] = {}
+
+    def expect(self, *names: str):
+        for name in names:
+            self.checks.setdefault(name, False)
+
+    def set(self, name: str, ok: bool = True):
+        self.checks[name] = ok
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.checks) and all(self.checks.values())
+
+
+readiness = Readiness()
@@ -0,0 +1,96 @@
+from typing import List
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.config import RESERVATION_GRANULARITY_MINUTES
+from app.database import appointments_collection, reservations_collection
+from app.services.availability import INACTIVE_STATUSES
+from app.services.schedule_index import minute_fields, to_minutes, to_minutes_ceil
+
+
+def check_aligned(start: int, end: int, granularity: int = RESERVATION_GRANULARITY_MINUTES):
+    """Raise ValueError unless [start, end) minutes begins and ends on a reservation bucket boundary.
+
+    Buckets only tell bookings apart at their own resolution: 10:02-10:07 and
+    10:07-10:12 would both claim the 10:05 bucket.
+    """
+    if start % granularity or end % granularity:
+        raise ValueError(f"Appointments must start and end on a {granularity}-minute boundary")
+
+
+def slot_keys(start_time: str, end_time: str, granularity: int = RESERVATION_GRANULARITY_MINUTES) -> List[int]:
+    """Start minute of every granularity bucket of an aligned [start, end) interval"""
+    start, end = to_minutes(start_time), to_minutes_ceil(end_time)
+    check_aligned(start, end, granularity)
+    return list(range(start, end, granularity))
+
+
+async def reserve_slots(appointment_id: ObjectId, doctor_id: ObjectId, appointment_date: str,
+                        start_time: str, end_time: str):
+    """Claim every slot of an appointment, all or nothing; raises 400 if any is already taken or the times are unaligned"""
+    try:
+        keys = slot_keys(start_time, end_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    documents = [
+        {"doctor_id": doctor_id, "date": appointment_date, "slot": slot, "appointment_id": appointment_id}
+        for slot in keys
+    ]
+    try:
+        await reservations_collection.insert_many(documents, ordered=True)
+    except (BulkWriteError, DuplicateKeyError):
+        # Ordered insert stops at the first taken slot; undo the ones we did claim
+        await release_slots(appointment_id)
+        raise HTTPException(
+            status_code=400,
+            detail="This time slot is already booked"
+        )
+
+
+async def release_slots(appointment_id: ObjectId):
+    await reservations_collection.delete_many({"appointment_id": appointment_id})
+
+
+async def insert_appointment(appointment: dict) -> ObjectId:
+    """Reserve the appointment's slots, then insert it. Dates and times must already be ISO strings."""
+    appointment.setdefault("_id", ObjectId())
+    appointment.update(minute_fields(appointment["start_time"], appointment["end_time"]))
+    await reserve_slots(
+        appointment["_id"],
+        appointment["doctor_id"],
+        appointment["appointment_date"],
+        appointment["start_time"],
+        appointment["end_time"],
+    )
+    try:
+        await appointments_collection.insert_one(appointment)
+    except Exception:
+        await release_slots(appointment["_id"])
+        raise
+    return appointment["_id"]
+
+
+async def backfill_reservations(batch_size: int = 1000) -> int:
+    """Reserve slots for active appointments created before reservations existed; safe to re-run"""
+    reserved = 0
+    cursor = appointments_collection.find(
+        {"status": {"$nin": INACTIVE_STATUSES}},
+        {"doctor_id": 1, "appointment_date": 1, "start_time": 1, "end_time": 1},
+    ).batch_size(batch_size)
+    async for appointment in cursor:
+        if await reservations_collection.find_one({"appointment_id": appointment["_id"]}, {"_id": 1}):
+            continue
+        try:
+            await reserve_slots(
+                appointment["_id"],
+                appointment["doctor_id"],
+                appointment["appointment_date"],
+                appointment["start_time"],
+                appointment["end_time"],
+            )
+            reserved += 1
+        except HTTPException as e:
+            print(f"[Reservations] Appointment {appointment['_id']} skipped: {e.detail}")
+    return reserved
@@ -0,0 +1,64 @@
+from bisect import bisect_right
+from datetime import time
+from typing import List, Tuple
+
+Interval = Tuple[int, int]
+
+
+def to_minutes(value: str) -> int:
+    """'HH:MM[:SS[.ffffff]]' -> minutes since midnight, without strptime"""
+    return int(value[0:2]) * 60 + int(value[3:5])
+
+
+def to_minutes_ceil(value: str) -> int:
+    """Like to_minutes, but a partial minute ('10:30:15') counts as the next one"""
+    return to_minutes(value) + (1 if value[6:8] not in ("", "00") else 0)
+
+
+def minute_fields(start_time: str, end_time: str) -> dict:
+    """Integer-minute copies of an appointment's ISO times, stored next to them for range queries"""
+    return {"start_minute": to_minutes(start_time), "end_minute": to_minutes_ceil(end_time)}
+
+
+def time_to_minutes(value: time, round_up: bool = False) -> int:
+    minutes = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minutes += 1
+    return minutes
+
+
+class WeeklySchedule:
+    """A doctor's working hours as sorted, merged (start_minute, end_minute) arrays per weekday (0 = Monday)"""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, availability: List[dict]):
+        by_day: List[List[Interval]] = [[] for _ in range(7)]
+        for schedule in availability:
+            for slot in schedule["time_slots"]:
+                by_day[schedule["day_of_week"]].append((to_minutes(slot["start_time"]), to_minutes(slot["end_time"])))
+
+        self.starts: List[List[int]] = []
+        self.ends: List[List[int]] = []
+        for intervals in by_day:
+            starts, ends = [], []
+            for start, end in sorted(intervals):
+                # Merge overlapping windows so containment is a single bisect
+                if ends and start < ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.starts.append(starts)
+            self.ends.append(ends)
+
+    def works_on(self, weekday: int) -> bool:
+        return bool(self.starts[weekday])
+
+    def windows(self, weekday: int) -> List[Interval]:
+        return list(zip(self.starts[weekday], self.ends[weekday]))
+
+    def contains(self, weekday: int, start: int, end: int) -> bool:
+        """True if [start, end) lies inside one working window of that weekday"""
+        index = bisect_right(self.starts[weekday], start) - 1
+        return index >= 0 and end <= self.ends[weekday][index]
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Set
+
+from fastapi import WebSocket
+
+from app.config import DRAIN_TIMEOUT
+
+
+class SessionRegistry:
+    """Open /ws/proxy sessions of this worker, so shutdown can let them finish.
+
+    Once ``drain`` starts, new sessions are refused and existing ones get up to
+    ``timeout`` seconds to end on their own before they are closed.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self._sessions: Set[WebSocket] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def add(self, websocket: WebSocket) -> bool:
+        if self.draining:
+            return False
+        self._sessions.add(websocket)
+        self._idle.clear()
+        return True
+
+    def discard(self, websocket: WebSocket):
+        self._sessions.discard(websocket)
+        if not self._sessions:
+            self._idle.set()
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT):
+        self.draining = True
+        if not self._sessions:
+            return
+        print(f"[Shutdown] Draining {len(self._sessions)} voice session(s) for up to {timeout}s")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[Shutdown] Closing {len(self._sessions)} voice session(s) still open")
+            for websocket in list(self._sessions):
+                try:
+                    await websocket.close(code=1001, reason="Server shutting down")
+                except Exception:
+                    pass
+
+
+session_registry = SessionRegistry()
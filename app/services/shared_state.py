@@ -0,0 +1,202 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+from app.config import SHARED_STATE_URL
+
+try:
+    import redis.asyncio as redis_asyncio  # type: ignore
+except ImportError:
+    redis_asyncio = None
+
+# Identifies this process in published messages so it can skip its own
+WORKER_ID = f"{os.getpid()}-{os.urandom(4).hex()}"
+
+
+class SharedStore(ABC):
+    """State shared by all workers: TTL'd keys, counters, FIFO lists and pub/sub.
+
+    Values are strings; callers serialize. The in-memory store only spans one
+    process and is the default for single-worker runs; RedisStore (or anything
+    speaking the Redis protocol) shares the state across workers and hosts.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        """Increment a counter; ``ttl`` starts when the counter is created"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def push(self, key: str, value: str, front: bool = False):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def pop(self, key: str) -> Optional[str]:
+        """Remove and return the head of a list"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def length(self, key: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryStore(SharedStore):
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lists: Dict[str, Deque[str]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        if only_if_absent and self._live(key) is not None:
+            return False
+        self._values[key] = (value, time.monotonic() + ttl if ttl else None)
+        return True
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        current = self._live(key)
+        if current is None:
+            self._values[key] = ("1", time.monotonic() + ttl if ttl else None)
+            return 1
+        value = int(current) + 1
+        self._values[key] = (str(value), self._values[key][1])
+        return value
+
+    async def push(self, key: str, value: str, front: bool = False):
+        items = self._lists.setdefault(key, deque())
+        if front:
+            items.appendleft(value)
+        else:
+            items.append(value)
+
+    async def pop(self, key: str) -> Optional[str]:
+        items = self._lists.get(key)
+        return items.popleft() if items else None
+
+    async def length(self, key: str) -> int:
+        return len(self._lists.get(key, ()))
+
+    async def publish(self, channel: str, message: str):
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
+
+
+class RedisStore(SharedStore):
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("SHARED_STATE_URL points at Redis but the redis package is not installed")
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        px = int(ttl * 1000) if ttl else None
+        return bool(await self._redis.set(key, value, px=px, nx=only_if_absent))
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        value = await self._redis.incr(key)
+        if value == 1 and ttl:
+            await self._redis.pexpire(key, int(ttl * 1000))
+        return value
+
+    async def push(self, key: str, value: str, front: bool = False):
+        if front:
+            await self._redis.lpush(key, value)
+        else:
+            await self._redis.rpush(key, value)
+
+    async def pop(self, key: str) -> Optional[str]:
+        return await self._redis.lpop(key)
+
+    async def length(self, key: str) -> int:
+        return await self._redis.llen(key)
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_store(url: str = SHARED_STATE_URL) -> SharedStore:
+    """``memory://`` (default) or a ``redis://`` / ``rediss://`` URL"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    if url.startswith("memory://"):
+        return MemoryStore()
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+shared_store = create_store()
+
+
+class RateLimiter:
+    """Fixed-window limit of ``limit`` hits per ``window`` seconds per key, counted in the shared store"""
+
+    def __init__(self, name: str, limit: int, window: float, store: Optional[SharedStore] = None):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.store = store or shared_store
+
+    async def allow(self, key: str) -> bool:
+        if self.limit <= 0:
+            return True
+        bucket = int(time.time() // self.window)
+        count = await self.store.incr(f"ratelimit:{self.name}:{key}:{bucket}", ttl=self.window)
+        return count <= self.limit
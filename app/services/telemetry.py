@@ -0,0 +1,188 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from pymongo import monitoring
+
+try:
+    import prometheus_client  # type: ignore
+except ImportError:
+    prometheus_client = None
+
+try:
+    # API only: spans are no-ops unless the deployment configures an SDK/exporter
+    from opentelemetry import trace as otel_trace  # type: ignore
+except ImportError:
+    otel_trace = None
+
+# Voice turns are judged in hundreds of milliseconds; tools and Mongo in single ones
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Name of the tool whose call is running in this task; Motor copies it onto its executor threads
+current_tool: ContextVar[Optional[str]] = ContextVar("current_tool", default=None)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _gauge(name: str, documentation: str):
+    if prometheus_client is None:
+        return _NoopMetric()
+    # Sum across workers when PROMETHEUS_MULTIPROC_DIR is set
+    return prometheus_client.Gauge(name, documentation, multiprocess_mode="livesum")
+
+
+UPSTREAM_CONNECT_SECONDS = _histogram(
+    "realtime_upstream_connect_seconds", "Time to open the upstream Realtime WebSocket"
+)
+SESSION_UPDATE_ACK_SECONDS = _histogram(
+    "realtime_session_update_ack_seconds", "Time from sending session.update to session.updated"
+)
+FIRST_AUDIO_SECONDS = _histogram(
+    "realtime_first_audio_seconds", "Time from the end of the caller's speech (buffer committed) to the first response.audio.delta"
+)
+TOOL_QUEUE_WAIT_SECONDS = _histogram(
+    "realtime_tool_queue_wait_seconds", "Time a tool call waited for a free worker", ["tool"]
+)
+TOOL_EXECUTION_SECONDS = _histogram(
+    "realtime_tool_execution_seconds", "Tool call execution time", ["tool", "outcome"]
+)
+TOOL_MONGO_SECONDS = _histogram(
+    "realtime_tool_mongo_seconds", "Mongo command time issued by a tool call", ["tool", "command"], QUERY_BUCKETS
+)
+ACTIVE_SESSIONS = _gauge("realtime_active_sessions", "Open voice proxy sessions")
+
+
+def metrics_payload() -> Optional[Tuple[bytes, str]]:
+    """Prometheus exposition of the metrics, or None without prometheus_client"""
+    if prometheus_client is None:
+        return None
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Multi-worker runs: merge every worker's samples, whichever one gets scraped
+        from prometheus_client import multiprocess  # type: ignore
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def _wall_ns(monotonic: float) -> int:
+    """Epoch nanoseconds for a time.monotonic() reading, as span timestamps need"""
+    return int((time.time() - (time.monotonic() - monotonic)) * 1e9)
+
+
+def _record_span(name: str, started: float, ended: float, parent=None, **attributes):
+    """Emit an already-finished span; timestamps are time.monotonic() seconds"""
+    if otel_trace is None:
+        return
+    tracer = otel_trace.get_tracer("app.realtime")
+    context = otel_trace.set_span_in_context(parent) if parent is not None else None
+    span = tracer.start_span(name, context=context, start_time=_wall_ns(started), attributes=attributes)
+    span.end(end_time=_wall_ns(ended))
+
+
+def record_tool_call(tool: str, enqueued: float, started: float, outcome: str, parent=None):
+    """Queue wait and execution time of one tool call; timestamps are time.monotonic() seconds"""
+    ended = time.monotonic()
+    TOOL_QUEUE_WAIT_SECONDS.labels(tool).observe(started - enqueued)
+    TOOL_EXECUTION_SECONDS.labels(tool, outcome).observe(ended - started)
+    _record_span("realtime.tool_queue_wait", enqueued, started, parent, tool=tool)
+    _record_span("realtime.tool_call", started, ended, parent, tool=tool, outcome=outcome)
+
+
+class SessionTrace:
+    """Timing state for one voice session: feeds the histograms and, if enabled, an OpenTelemetry span tree.
+
+    Durations use time.monotonic(), so clock adjustments never skew them.
+    """
+
+    def __init__(self, model: str):
+        self.span = None
+        if otel_trace is not None:
+            self.span = otel_trace.get_tracer("app.realtime").start_span(
+                "realtime.session", attributes={"realtime.model": model}
+            )
+        self._session_update_sent: Optional[float] = None
+        self._speech_ended: Optional[float] = None
+        self._turn_started: Optional[float] = None
+        ACTIVE_SESSIONS.inc()
+
+    def upstream_connected(self, started: float):
+        self._observe(UPSTREAM_CONNECT_SECONDS, "realtime.upstream_connect", started)
+
+    def session_update_sent(self):
+        self._session_update_sent = time.monotonic()
+
+    def session_updated(self):
+        if self._session_update_sent is not None:
+            self._observe(SESSION_UPDATE_ACK_SECONDS, "realtime.session_update_ack", self._session_update_sent)
+            self._session_update_sent = None
+
+    def speech_started(self):
+        # A turn that never got a response must not anchor the next one
+        self._speech_ended = None
+
+    def speech_ended(self):
+        # speech_stopped (server VAD) is followed by committed; the first of the two ends the turn.
+        # Client audio keeps streaming through silence, so the last append would be too late an anchor.
+        if self._speech_ended is None:
+            self._speech_ended = time.monotonic()
+
+    def response_created(self):
+        # Responses requested after a tool result have no new speech; only time the first one per turn
+        if self._speech_ended is not None:
+            self._turn_started = self._speech_ended
+            self._speech_ended = None
+
+    def audio_delta(self):
+        if self._turn_started is not None:
+            self._observe(FIRST_AUDIO_SECONDS, "realtime.first_audio", self._turn_started)
+            self._turn_started = None
+
+    def close(self):
+        ACTIVE_SESSIONS.dec()
+        if self.span is not None:
+            self.span.end()
+
+    def _observe(self, histogram, span_name: str, started: float):
+        ended = time.monotonic()
+        histogram.observe(ended - started)
+        _record_span(span_name, started, ended, self.span)
+
+
+class MongoToolTimer(monitoring.CommandListener):
+    """Attributes Mongo command time to the tool call that issued it"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event)
+
+    def failed(self, event):
+        self._observe(event)
+
+    def _observe(self, event):
+        tool = current_tool.get()
+        if tool is not None:
+            TOOL_MONGO_SECONDS.labels(tool, event.command_name).observe(event.duration_micros / 1e6)
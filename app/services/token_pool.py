@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.services.openai_service import create_openai_session
+from app.config import (
+    TOKEN_POOL_IDLE_TIMEOUT,
+    TOKEN_POOL_MAX_KEYS,
+    TOKEN_POOL_MIN_TTL,
+    TOKEN_POOL_REFILL_INTERVAL,
+    TOKEN_POOL_SIZE,
+)
+from app.services.shared_state import WORKER_ID, SharedStore, shared_store
+
+PoolKey = Tuple[str, str, str]
+Mint = Callable[[str, str, Optional[str]], Awaitable[dict]]
+
+
+def pool_key(model: str, voice: str, instructions: Optional[str]) -> PoolKey:
+    digest = hashlib.sha256((instructions or "").encode("utf-8")).hexdigest()
+    return model, voice, digest
+
+
+def _list_key(key: PoolKey) -> str:
+    return "token_pool:" + ":".join(key)
+
+
+def _expires_at(session: dict) -> float:
+    return float(session.get("client_secret", {}).get("expires_at", 0))
+
+
+class SessionTokenPool:
+    """Pre-minted ephemeral Realtime session tokens, keyed by (model, voice, instructions hash).
+
+    Keys are warmed the first time a token for them is minted successfully (up
+    to ``max_keys``, least recently used evicted) and topped back up to ``size``
+    in the background until they go ``idle_timeout`` seconds without an
+    acquire, or a refill fails to mint anything.
+    Tokens closer than ``min_ttl`` seconds to expiry are discarded, and an empty
+    pool falls back to minting on demand. Tokens live in the shared store, so
+    every worker draws from one pool; a short lease keeps workers from
+    refilling the same key at the same time.
+    """
+
+    def __init__(
+        self,
+        mint: Mint,
+        size: int = TOKEN_POOL_SIZE,
+        min_ttl: float = TOKEN_POOL_MIN_TTL,
+        refill_interval: float = TOKEN_POOL_REFILL_INTERVAL,
+        max_keys: int = TOKEN_POOL_MAX_KEYS,
+        idle_timeout: float = TOKEN_POOL_IDLE_TIMEOUT,
+        store: Optional[SharedStore] = None,
+    ):
+        self.mint = mint
+        self.size = size
+        self.min_ttl = min_ttl
+        self.refill_interval = refill_interval
+        self.max_keys = max_keys
+        self.idle_timeout = idle_timeout
+        self.store = store or shared_store
+
+        self._params: "OrderedDict[PoolKey, tuple]" = OrderedDict()
+        self._last_acquired: Dict[PoolKey, float] = {}
+        self._refilling: Dict[PoolKey, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.size > 0 and self._task is None:
+            self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        tasks = list(self._refilling.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refilling.clear()
+
+    def warm(self, model: str, voice: str, instructions: Optional[str] = None):
+        """Register a key so the background loop keeps it filled"""
+        if self.size <= 0:
+            return
+        key = pool_key(model, voice, instructions)
+        self._params[key] = (model, voice, instructions)
+        self._params.move_to_end(key)
+        self._last_acquired[key] = time.monotonic()
+        while len(self._params) > self.max_keys:
+            self._forget(next(iter(self._params)))
+        self._schedule_refill(key)
+
+    def _forget(self, key: PoolKey):
+        """Stop refilling a key; tokens already pooled are served until they expire"""
+        self._params.pop(key, None)
+        self._last_acquired.pop(key, None)
+
+    async def acquire(self, model: str, voice: str, instructions: Optional[str] = None) -> dict:
+        key = pool_key(model, voice, instructions)
+        session = await self._pop_fresh(key) if self.size > 0 else None
+        if session is None:
+            # Cold key or drained pool: pay the round trip now; a key whose mint fails is not warmed
+            session = await self.mint(model, voice, instructions)
+
+        self.warm(model, voice, instructions)
+        return session
+
+    async def stats(self) -> Dict[str, int]:
+        tokens = 0
+        for key in list(self._params):
+            tokens += await self.store.length(_list_key(key))
+        return {"keys": len(self._params), "tokens": tokens}
+
+    async def _pop_fresh(self, key: PoolKey) -> Optional[dict]:
+        """Pop the oldest token that is not about to expire, discarding the ones that are"""
+        cutoff = time.time() + self.min_ttl
+        while True:
+            raw = await self.store.pop(_list_key(key))
+            if raw is None:
+                return None
+            session = json.loads(raw)
+            if _expires_at(session) >= cutoff:
+                return session
+
+    def _schedule_refill(self, key: PoolKey):
+        if key in self._refilling or key not in self._params:
+            return
+        task = asyncio.create_task(self._refill(key))
+        self._refilling[key] = task
+        task.add_done_callback(lambda _: self._refilling.pop(key, None))
+
+    async def _refill(self, key: PoolKey):
+        params = self._params.get(key)
+        list_key = _list_key(key)
+        # One worker refills a key per interval; the others skip it
+        if params is None or not await self.store.set(
+            f"{list_key}:lease", WORKER_ID, ttl=self.refill_interval, only_if_absent=True
+        ):
+            return
+
+        model, voice, instructions = params
+        # Tokens are appended in mint order, so expiring ones sit at the head
+        session = await self._pop_fresh(key)
+        if session is not None:
+            await self.store.push(list_key, json.dumps(session), front=True)
+        missing = self.size - await self.store.length(list_key)
+        if missing <= 0:
+            return
+
+        results = await asyncio.gather(
+            *(self.mint(model, voice, instructions) for _ in range(missing)),
+            return_exceptions=True,
+        )
+        minted = []
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"[Token Pool] Failed to pre-mint session token: {result}")
+                continue
+            minted.append(result)
+        if not minted:
+            # Likely a bad model/voice or no quota; warming resumes with the next successful acquire
+            print(f"[Token Pool] Not warming {model}/{voice} until a session is minted on demand again")
+            self._forget(key)
+            return
+        # Minted concurrently; append the soonest-expiring first
+        for session in sorted(minted, key=_expires_at):
+            await self.store.push(list_key, json.dumps(session))
+
+    async def _refill_loop(self):
+        while True:
+            await asyncio.sleep(self.refill_interval)
+            idle_since = time.monotonic() - self.idle_timeout
+            for key in list(self._params):
+                if self._last_acquired.get(key, 0.0) < idle_since:
+                    self._forget(key)
+                else:
+                    self._schedule_refill(key)
+
+
+session_token_pool = SessionTokenPool(create_openai_session)
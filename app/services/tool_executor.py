@@ -0,0 +1,103 @@
+import asyncio
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import TOOL_QUEUE_SIZE, TOOL_RESULTS_ORDERED, TOOL_TIMEOUTS, TOOL_WORKERS
+from app.services.query_profiler import profile_queries
+from app.services.telemetry import SessionTrace, current_tool, record_tool_call
+
+RunTool = Callable[[str, dict], Awaitable[dict]]
+SendResult = Callable[[str, dict], Awaitable[None]]
+
+
+class ToolExecutor:
+    """Per-session pool of workers that run tool calls off the upstream reader.
+
+    Calls are queued on a bounded queue and executed by a fixed number of
+    workers, each call under its tool's timeout. When ``ordered`` is set,
+    results are written back in the order the calls were submitted.
+    """
+
+    def __init__(
+        self,
+        run_tool: RunTool,
+        send_result: SendResult,
+        workers: int = TOOL_WORKERS,
+        queue_size: int = TOOL_QUEUE_SIZE,
+        timeouts: Optional[Dict[str, float]] = None,
+        ordered: bool = TOOL_RESULTS_ORDERED,
+        trace: Optional[SessionTrace] = None,
+    ):
+        self.run_tool = run_tool
+        self.send_result = send_result
+        self.workers = workers
+        self.timeouts = timeouts or TOOL_TIMEOUTS
+        self.ordered = ordered
+        self.trace = trace
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+        self._seq = itertools.count()
+        self._next_to_send = 0
+        self._ready: Dict[int, tuple] = {}
+        self._send_lock = asyncio.Lock()
+
+    def start(self):
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def submit(self, call_id: str, tool_name: str, tool_params: dict):
+        """Queue a call without blocking the caller; reject it if the session is saturated"""
+        seq = next(self._seq)
+        try:
+            self._queue.put_nowait((seq, call_id, tool_name, tool_params, time.monotonic()))
+        except asyncio.QueueFull:
+            print(f"[Tool Executor] Queue full, rejecting {tool_name} ({call_id})")
+            await self._deliver(seq, call_id, {"error": "Too many pending tool calls, try again"})
+
+    async def close(self):
+        """Cancel queued and in-flight calls, e.g. when the client disconnects"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _worker(self):
+        while True:
+            seq, call_id, tool_name, tool_params, enqueued = await self._queue.get()
+            started = time.monotonic()
+            try:
+                content, outcome = await self._execute(tool_name, tool_params)
+                record_tool_call(tool_name, enqueued, started, outcome, self.trace.span if self.trace else None)
+                await self._deliver(seq, call_id, content)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, tool_name: str, tool_params: dict) -> Tuple[dict, str]:
+        timeout = self.timeouts.get(tool_name, self.timeouts["default"])
+        # Set before wait_for so the task it creates (and Motor's threads) see the tool name
+        token = current_tool.set(tool_name)
+        try:
+            with profile_queries(f"tool {tool_name}"):
+                return await asyncio.wait_for(self.run_tool(tool_name, tool_params), timeout), "ok"
+        except asyncio.TimeoutError:
+            print(f"[Tool Executor] {tool_name} timed out after {timeout}s")
+            return {"error": f"{tool_name} timed out, try again"}, "timeout"
+        except Exception as e:
+            return {"error": str(e)}, "error"
+        finally:
+            current_tool.reset(token)
+
+    async def _deliver(self, seq: int, call_id: str, content: dict):
+        async with self._send_lock:
+            if not self.ordered:
+                await self.send_result(call_id, content)
+                return
+
+            # Hold results that finished early until every earlier call is written back
+            self._ready[seq] = (call_id, content)
+            while self._next_to_send in self._ready:
+                ready_call_id, ready_content = self._ready.pop(self._next_to_send)
+                self._next_to_send += 1
+                await self.send_result(ready_call_id, ready_content)
@@ -0,0 +1,229 @@
+import datetime
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.config import SLOT_DURATION_MINUTES, TOOL_MAX_SLOTS
+from app.endpoints.appoinments_routes import check_doctor_availability, get_doctor_or_404
+from app.models.appoinments import AppointmentStatus
+from app.services.availability import find_bookable_slots, format_minutes
+from app.services.doctor_search import doctor_search_index
+from app.services.reservations import insert_appointment
+
+
+class ToolArgumentError(ValueError):
+    """Raised when the model calls a tool with missing or malformed arguments"""
+
+
+def _as_string(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError("expected a string")
+    return value
+
+
+def _as_integer(value: Any) -> int:
+    # Models sometimes quote numbers; accept "30" but not 30.5 or True
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("expected an integer")
+    return int(value)
+
+
+# Coercers keyed by the JSON schema (type, format) of a property
+_COERCERS: Dict[tuple, Callable[[Any], Any]] = {
+    ("string", None): _as_string,
+    ("string", "date"): lambda value: datetime.date.fromisoformat(_as_string(value)),
+    ("string", "time"): lambda value: datetime.time.fromisoformat(_as_string(value)),
+    ("integer", None): _as_integer,
+}
+
+
+class ToolStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, elapsed: float):
+        self.calls += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class Tool:
+    """A function the Realtime model can call: schema, argument parsing and handler in one place"""
+
+    def __init__(self, name: str, description: str, properties: Dict[str, dict], required: List[str],
+                 handler: Callable[..., Awaitable[dict]]):
+        self.name = name
+        self.handler = handler
+        self.stats = ToolStats()
+        self.definition = {
+            "type": "function",
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        }
+        # Precompile the argument parser once so a bad call fails before any query runs
+        self._fields = [
+            (key, key in required, _COERCERS[(schema["type"], schema.get("format"))])
+            for key, schema in properties.items()
+        ]
+
+    def parse_arguments(self, params: dict) -> Dict[str, Any]:
+        if not isinstance(params, dict):
+            raise ToolArgumentError(f"{self.name} expects an object of arguments")
+
+        args = {}
+        for key, required, coerce in self._fields:
+            value = params.get(key)
+            if value is None:
+                if required:
+                    raise ToolArgumentError(f"Missing argument '{key}' for {self.name}")
+                continue
+            try:
+                args[key] = coerce(value)
+            except ValueError as e:
+                raise ToolArgumentError(f"Invalid value for '{key}': {e}")
+        return args
+
+    async def __call__(self, params: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            # Inside the try: a malformed call counts as a call and an error like any other failure
+            args = self.parse_arguments(params)
+            return await self.handler(**args)
+        except Exception:
+            self.stats.errors += 1
+            raise
+        except BaseException:
+            # Timed out by the executor or the session went away
+            self.stats.cancelled += 1
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - start)
+
+
+TOOL_REGISTRY: Dict[str, Tool] = {}
+
+
+def tool(name: str, description: str, properties: Dict[str, dict], required: List[str]):
+    """Register an async handler as a Realtime tool"""
+    def decorator(handler):
+        if name in TOOL_REGISTRY:
+            raise ValueError(f"Tool '{name}' is already registered")
+        TOOL_REGISTRY[name] = Tool(name, description, properties, required, handler)
+        return handler
+    return decorator
+
+
+async def run_tool(tool_name: str, tool_params: dict) -> dict:
+    """Execute a function call requested by the Realtime model"""
+    registered = TOOL_REGISTRY.get(tool_name)
+    if registered is None:
+        return {"error": "Unknown tool"}
+    return await registered(tool_params)
+
+
+def get_tool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: registered.stats.as_dict() for name, registered in TOOL_REGISTRY.items()}
+
+
+@tool(
+    name="search_doctor_by_name",
+    description="ابحث عن الأطباء باستخدام الاسم أو التخصص.",
+    properties={
+        "name": {"type": "string", "description": "الاسم أو التخصص الذي يبحث عنه المريض"}
+    },
+    required=["name"],
+)
+async def search_doctor_by_name(name: str):
+    # In-process fuzzy index: tolerant of hamza/ta marbuta variants and Latin spellings, unlike $text
+    results = await doctor_search_index.search(name)
+    if not results:
+        return {"doctors": [], "message": "لم يتم العثور على طبيب بهذا الاسم"}
+    return {"doctors": results}
+
+
+@tool(
+    name="get_doctor_availability",
+    description="اعرض المواعيد المتاحة للحجز عند طبيب في يوم معين.",
+    properties={
+        "doctor_id": {"type": "string"},
+        "date": {"type": "string", "format": "date"},
+        "duration_minutes": {"type": "integer", "description": "مدة الموعد بالدقائق"}
+    },
+    required=["doctor_id", "date"],
+)
+async def get_doctor_availability(doctor_id: str, date: datetime.date, duration_minutes: Optional[int] = None):
+    doctor = await get_doctor_or_404(doctor_id)
+    duration = duration_minutes or SLOT_DURATION_MINUTES
+    if not 5 <= duration <= 480:
+        raise ToolArgumentError("duration_minutes must be between 5 and 480")
+
+    slots = (await find_bookable_slots(doctor, date, date, duration)).get(date.isoformat(), [])
+    if not slots:
+        return {"available_slots": [], "message": "لا توجد مواعيد متاحة في هذا اليوم"}
+
+    # Keep the answer short enough to read out; the model can ask for another day
+    return {
+        "available_slots": [
+            {"start_time": format_minutes(start), "end_time": format_minutes(end)}
+            for start, end in slots[:TOOL_MAX_SLOTS]
+        ],
+        "more_slots": max(0, len(slots) - TOOL_MAX_SLOTS)
+    }
+
+
+@tool(
+    name="book_appointment",
+    description="احجز موعدًا بعد تأكيد المريض.",
+    properties={
+        "patient_email": {"type": "string"},
+        "doctor_id": {"type": "string"},
+        "patient_name": {"type": "string"},
+        "appointment_date": {"type": "string", "format": "date"},
+        "start_time": {"type": "string", "format": "time"},
+        "end_time": {"type": "string", "format": "time"}
+    },
+    required=["doctor_id", "patient_email", "appointment_date", "start_time", "end_time"],
+)
+async def book_appointment(doctor_id: str, patient_email: str, appointment_date: datetime.date,
+                           start_time: datetime.time, end_time: datetime.time,
+                           patient_name: Optional[str] = None):
+    # Check availability
+    await check_doctor_availability(doctor_id, appointment_date, start_time, end_time)
+
+    # Reserve the slot and insert; a concurrent booking of the same slot fails here
+    await insert_appointment({
+        "doctor_id": ObjectId(doctor_id),
+        "patient_name": patient_name,
+        "patient_email": patient_email,
+        "appointment_date": appointment_date.isoformat(),
+        "start_time": start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "status": AppointmentStatus.SCHEDULED,
+        "created_at": datetime.datetime.now(),
+        "updated_at": datetime.datetime.now()
+    })
+
+    return {"status": "success", "message": "تم الحجز بنجاح!"}
+
+
+# Built once at import time from the registry above
+TOOL_DEFINITIONS = [registered.definition for registered in TOOL_REGISTRY.values()]
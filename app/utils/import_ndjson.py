@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import json
+
+from app.services.bulk_import import import_appointments, import_doctors, iter_lines
+
+
+async def read_file(path: str, block_size: int = 1 << 16):
+    # Plain blocking reads are fine for a one-off CLI run
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+async def main(kind: str, path: str, chunk_size: int, check_schedule: bool) -> dict:
+    lines = iter_lines(read_file(path))
+    if kind == "doctors":
+        return await import_doctors(lines, chunk_size)
+    return await import_appointments(lines, chunk_size, check_schedule)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import doctors or appointments from an NDJSON file")
+    parser.add_argument("kind", choices=["doctors", "appointments"])
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--no-schedule-check", action="store_true", help="accept appointments outside the weekly schedule (historical data)")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args.kind, args.path, args.chunk_size, not args.no_schedule_check))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.database import appointments_collection
+from app.services.reservations import backfill_reservations
+from app.services.schedule_index import minute_fields
+
+
+async def migrate(batch_size: int = 1000, dry_run: bool = False) -> int:
+    """Add start_minute/end_minute to appointments stored before they existed; safe to re-run"""
+    migrated = 0
+    batch = []
+    cursor = appointments_collection.find(
+        {"start_minute": {"$exists": False}},
+        {"start_time": 1, "end_time": 1},
+    ).batch_size(batch_size)
+
+    async for appointment in cursor:
+        batch.append(UpdateOne(
+            {"_id": appointment["_id"]},
+            {"$set": minute_fields(appointment["start_time"], appointment["end_time"])},
+        ))
+        if len(batch) >= batch_size:
+            migrated += await _flush(batch, dry_run)
+            batch = []
+
+    if batch:
+        migrated += await _flush(batch, dry_run)
+    return migrated
+
+
+async def _flush(batch, dry_run: bool) -> int:
+    if dry_run:
+        return len(batch)
+    result = await appointments_collection.bulk_write(batch, ordered=False)
+    return result.modified_count
+
+
+async def main(batch_size: int, dry_run: bool, reservations: bool):
+    count = await migrate(batch_size, dry_run)
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {count} appointments")
+    if reservations and not dry_run:
+        reserved = await backfill_reservations(batch_size)
+        print(f"Reserved slots for {reserved} appointments")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill integer-minute time fields on appointments")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--reservations", action="store_true", help="also claim slot reservations for existing appointments")
+    args = parser.parse_args()
+
+    # One event loop for both steps: the Motor client is bound to the loop it first ran on
+    asyncio.run(main(args.batch_size, args.dry_run, args.reservations))
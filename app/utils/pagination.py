@@ -0,0 +1,66 @@
+import base64
+import binascii
+from typing import Any, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+# Response headers carrying the keyset cursor and the optional count estimate
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_ESTIMATE_HEADER = "X-Total-Count-Estimate"
+
+
+def encode_cursor(sort_field: str, descending: bool, sort_value: Any, last_id: ObjectId) -> str:
+    """Opaque continuation token for the position right after (sort_value, last_id) in the given order"""
+    payload = json_util.dumps({"f": sort_field, "d": -1 if descending else 1, "v": sort_value, "id": last_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token: str, sort_field: str, descending: bool) -> Tuple[Any, ObjectId]:
+    """(sort_value, last_id) of a cursor; 400 if it is malformed or was issued for another sort"""
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        field, direction, sort_value, last_id = payload["f"], payload["d"], payload["v"], payload["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    # A value of one field compared against another (or the wrong way round) silently skips or repeats rows
+    if field != sort_field or direction != (-1 if descending else 1):
+        raise HTTPException(status_code=400, detail="Pagination cursor does not match the requested sort order")
+    return sort_value, last_id
+
+
+def keyset_filter(sort_field: str, sort_value: Any, last_id: ObjectId, descending: bool) -> dict:
+    """Documents strictly after (sort_value, last_id) in (sort_field, _id) order"""
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, "_id": {op: last_id}},
+    ]}
+
+
+async def find_page(collection, query: dict, sort_field: str, descending: bool = False, limit: int = 100,
+                    skip: int = 0, cursor: Optional[str] = None, projection: Optional[dict] = None
+                    ) -> Tuple[List[dict], Optional[str]]:
+    """One page in stable (sort_field, _id) order, by keyset cursor when given, else by offset.
+
+    Returns the documents and the cursor for the next page (None on the last page).
+    """
+    direction = DESCENDING if descending else ASCENDING
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_field, descending)
+        after = keyset_filter(sort_field, sort_value, last_id, descending)
+        query = {"$and": [query, after]} if query else after
+        skip = 0
+
+    if projection is not None and sort_field not in projection:
+        projection = {**projection, sort_field: 1}
+
+    find_cursor = collection.find(query, projection).sort([(sort_field, direction), ("_id", direction)])
+    documents = await find_cursor.skip(skip).limit(limit).to_list(length=limit)
+
+    next_cursor = None
+    if limit and len(documents) == limit:
+        last = documents[-1]
+        next_cursor = encode_cursor(sort_field, descending, last.get(sort_field), last["_id"])
+    return documents, next_cursor
@@ -0,0 +1,61 @@
+import json
+from enum import Enum
+from typing import Any, Iterable, List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        # Only reached by the json fallback; orjson encodes dates and times itself
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSON response for documents read straight from Mongo; uses orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ResponseShape:
+    """The fields of a response model, resolved once: a Mongo projection and a validation-free builder.
+
+    Documents we wrote ourselves already match the model, so re-validating them
+    on every read only costs time; the builder just picks the model's fields
+    and fills in defaults for optional ones that are missing.
+    """
+
+    def __init__(self, model: type[BaseModel], extra_fields: Iterable[str] = ()):
+        self.fields = []
+        for name, field in model.model_fields.items():
+            default = None if field.is_required() else field.get_default(call_default_factory=True)
+            self.fields.append((name, field.is_required(), default))
+        self.projection = {name: 1 for name in model.model_fields}
+        self.projection.update({name: 1 for name in extra_fields})
+
+    def build(self, document: dict) -> dict:
+        result = {}
+        for name, required, default in self.fields:
+            if name in document:
+                result[name] = document[name]
+            elif not required:
+                result[name] = default
+        return result
+
+    def build_many(self, documents: List[dict]) -> List[dict]:
+        return [self.build(document) for document in documents]
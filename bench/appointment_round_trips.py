@@ -0,0 +1,99 @@
+"""Mongo round trips per list_appointments page: one doctor lookup per appointment vs one $in per page.
+
+"before" is the old loop (find_one per appointment); "after" calls the
+list_appointments and get_appointment routes as they are now.
+
+Against a real server (--mongo) round trips are counted by the app's own
+QueryProfiler command listener. mongomock fires no command events, so there
+every find / find_one / aggregate call on a collection counts as one.
+
+    python bench/appointment_round_trips.py --page-size 100
+    python bench/appointment_round_trips.py --mongo mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import time
+
+from bson import ObjectId
+from seed import drop, seed, use_database
+
+COUNTED_METHODS = {"find", "find_one", "aggregate", "count_documents", "estimated_document_count"}
+
+
+def count_calls(database):
+    """mongomock only: count collection calls as round trips"""
+    calls = {"count": 0}
+    original = database.LazyCollection.__getattr__
+
+    def counting_getattr(self, attr):
+        if attr in COUNTED_METHODS:
+            calls["count"] += 1
+        return original(self, attr)
+
+    database.LazyCollection.__getattr__ = counting_getattr
+    return calls
+
+
+async def list_page_before(database, limit: int):
+    """The pre-batching list_appointments body"""
+    cursor = database.appointments_collection.find({}).sort([("appointment_date", 1), ("_id", 1)]).limit(limit)
+    appointments = []
+    async for appointment in cursor:
+        appointment["id"] = str(appointment["_id"])
+        doctor = await database.doctors_collection.find_one({"_id": appointment["doctor_id"]})
+        if doctor:
+            appointment["doctor"] = {"id": str(doctor["_id"]), "name": doctor["name"],
+                                     "specialization": doctor["specialization"]}
+        appointments.append(appointment)
+    return appointments
+
+
+async def main(args):
+    database = use_database(args.mongo)
+    from app.endpoints.appoinments_routes import get_appointment, list_appointments
+    from app.models.appoinments import AppointmentSort
+    from app.services.query_profiler import profile_queries
+
+    await seed(database, args.doctors, args.appointments)
+    calls = count_calls(database) if args.mongo is None else None
+
+    async def round_trips(work) -> tuple:
+        before = calls["count"] if calls else 0
+        started = time.perf_counter()
+        with profile_queries("bench") as profile:
+            await work()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return (calls["count"] - before if calls else profile.count), elapsed_ms
+
+    async def list_after():
+        await list_appointments(doctor_id=None, patient_email=None, appointment_date=None, status=None, skip=0,
+                                limit=args.page_size, cursor=None, sort=AppointmentSort.DATE, descending=False,
+                                include_total=False)
+
+    some_id = str((await database.appointments_collection.find_one({}, {"_id": 1}))["_id"])
+
+    async def get_before():
+        appointment = await database.appointments_collection.find_one({"_id": ObjectId(some_id)})
+        await database.doctors_collection.find_one({"_id": appointment["doctor_id"]})
+
+    print(f"{args.appointments} appointments, {args.doctors} doctors, page size {args.page_size}, "
+          f"{'QueryProfiler' if args.mongo else 'mongomock call counting'}")
+    for label, work in [
+        ("list page, before", lambda: list_page_before(database, args.page_size)),
+        ("list page, after", list_after),
+        ("get one, before", get_before),
+        ("get one, after", lambda: get_appointment(some_id)),
+    ]:
+        trips, elapsed_ms = await round_trips(work)
+        print(f"{label:<20} {trips:5d} round trips  {elapsed_ms:8.2f}ms")
+
+    await drop(database, args.mongo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count Mongo round trips per appointments page")
+    parser.add_argument("--mongo", help="MongoDB URL; defaults to mongomock")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--appointments", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+"""Proxy cost of audio frames: JSON/base64 text frames vs the binary PCM16 path.
+
+Replays an audio event trace through the per-frame work /ws/proxy does in each
+mode and reports client-link bytes and proxy time per frame:
+
+- text: the browser's append events and the upstream deltas pass through as
+  text; upstream frames are parsed once by the router
+- text (re-encoded): the old proxy, which also re-serialized every frame
+- binary: PCM16 frames from the browser become append events
+  (pcm16_to_append_event), upstream deltas are decoded to bytes
+  (audio_delta_to_pcm16)
+
+--trace takes a JSONL recording with one {"direction": "client" | "upstream",
+"event": {...}} object per line; only audio events are replayed. Without it,
+a synthetic trace of 24 kHz PCM16 is used: 20 ms frames from the browser and
+100 ms deltas from upstream.
+
+    python bench/audio_frames.py --seconds 60
+    python bench/audio_frames.py --trace session.jsonl
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.audio import audio_delta_to_pcm16, pcm16_to_append_event  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+def synthetic_trace(seconds: float):
+    def frames(ms: int):
+        size = SAMPLE_RATE * 2 * ms // 1000
+        return [os.urandom(size) for _ in range(int(seconds * 1000 / ms))]
+
+    client = [{"type": "input_audio_buffer.append", "audio": base64.b64encode(pcm).decode("ascii")} for pcm in frames(20)]
+    upstream = [
+        {"type": "response.audio.delta", "response_id": "resp_1", "item_id": "item_1", "output_index": 0,
+         "content_index": 0, "delta": base64.b64encode(pcm).decode("ascii")}
+        for pcm in frames(100)
+    ]
+    return client, upstream
+
+
+def load_trace(path: str):
+    client, upstream = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            event = record["event"]
+            if record["direction"] == "client" and event.get("type") == "input_audio_buffer.append":
+                client.append(event)
+            elif record["direction"] == "upstream" and event.get("type") == "response.audio.delta":
+                upstream.append(event)
+    return client, upstream
+
+
+def timed(frames, work):
+    started = time.perf_counter()
+    sent = sum(len(work(frame)) for frame in frames)
+    return sent, (time.perf_counter() - started) / max(len(frames), 1) * 1e6
+
+
+def report(direction: str, mode: str, frames, sent: int, us: float):
+    print(f"{direction:<10} {mode:<20} {len(frames):7d} frames  {sent / 1e6:9.2f} MB on client link  {us:8.2f} us/frame")
+
+
+def main(args):
+    client, upstream = load_trace(args.trace) if args.trace else synthetic_trace(args.seconds)
+    print(f"{len(client)} client appends, {len(upstream)} upstream deltas, best of {args.repeat}")
+
+    # What each mode receives: text frames as sent, or the raw PCM the browser would send instead
+    client_text = [json.dumps(event) for event in client]
+    client_pcm = [base64.b64decode(event["audio"]) for event in client]
+    upstream_text = [json.dumps(event) for event in upstream]
+
+    def best(frames, work):
+        return min((timed(frames, work) for _ in range(args.repeat)), key=lambda result: result[1])
+
+    # Client -> upstream; bytes counted on the browser side of the proxy
+    report("client", "text", client, sum(map(len, client_text)), best(client_text, lambda m: m)[1])
+    report("client", "text (re-encoded)", client, sum(map(len, client_text)),
+           best(client_text, lambda m: json.dumps(json.loads(m)))[1])
+    report("client", "binary", client, sum(map(len, client_pcm)), best(client_pcm, pcm16_to_append_event)[1])
+
+    # Upstream -> client; every upstream frame is parsed once by the router in all modes
+    report("upstream", "text", upstream, *best(upstream_text, lambda m: (json.loads(m), m)[1]))
+    report("upstream", "text (re-encoded)", upstream, *best(upstream_text, lambda m: json.dumps(json.loads(m))))
+    report("upstream", "binary", upstream, *best(upstream_text, lambda m: audio_delta_to_pcm16(json.loads(m)["delta"])))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the text and binary audio paths of /ws/proxy")
+    parser.add_argument("--trace", help="JSONL recording of audio events")
+    parser.add_argument("--seconds", type=float, default=60, help="length of the synthetic trace")
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""Requests per second on GET /api/v1/appointments/ with 100-item pages.
+
+"before" is the pre-projection route: full documents, an added "id", and
+FastAPI validating every item against response_model on the way out.
+"after" is the app's route: projected documents built by ResponseShape and
+serialized by MongoJSONResponse. Both run in-process over httpx's ASGI
+transport with the same batched doctor summaries, so the difference is
+fetch size plus response building.
+
+Use --mongo for meaningful numbers; on mongomock the pure-Python query
+engine dominates both sides, so the response building step is also timed on
+its own over one fetched page.
+
+    python bench/list_appointments_rps.py --requests 200
+    python bench/list_appointments_rps.py --mongo mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from seed import drop, seed, use_database
+
+
+def legacy_app(database):
+    from fastapi import FastAPI
+
+    from app.endpoints.appoinments_routes import attach_doctor_summaries
+    from app.models.appoinments import AppointmentResponse
+
+    legacy = FastAPI()
+
+    @legacy.get("/api/v1/appointments/", response_model=List[AppointmentResponse])
+    async def list_appointments(limit: int = 100):
+        cursor = database.appointments_collection.find({}).sort([("appointment_date", 1), ("_id", 1)]).limit(limit)
+        appointments = []
+        async for appointment in cursor:
+            appointment["id"] = str(appointment["_id"])
+            appointments.append(appointment)
+        return await attach_doctor_summaries(appointments)
+
+    return legacy
+
+
+async def run(app, requests: int, concurrency: int, page_size: int):
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/api/v1/appointments/", params={"limit": page_size})
+                response.raise_for_status()
+                assert len(response.json()) == page_size
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        await one()  # warm-up: route compilation, first client use
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return latencies, time.perf_counter() - started
+
+
+async def time_response_building(database, page_size: int, repeat: int):
+    """Per-page cost of turning fetched documents into a response body, without the database"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.endpoints.appoinments_routes import APPOINTMENT_SHAPE, attach_doctor_summaries
+    from app.models.appoinments import AppointmentResponse
+    from app.utils.responses import MongoJSONResponse
+
+    full = await database.appointments_collection.find({}).limit(page_size).to_list(length=page_size)
+    projected = await database.appointments_collection.find({}, APPOINTMENT_SHAPE.projection).limit(
+        page_size).to_list(length=page_size)
+    await attach_doctor_summaries(full)
+    await attach_doctor_summaries(projected)
+    adapter = TypeAdapter(List[AppointmentResponse])
+
+    def before():
+        # What FastAPI does with response_model: validate, encode, then render
+        documents = [{**document, "id": str(document["_id"])} for document in full]
+        JSONResponse(jsonable_encoder(adapter.validate_python(documents)))
+
+    def after():
+        MongoJSONResponse(APPOINTMENT_SHAPE.build_many([dict(document) for document in projected]))
+
+    for label, build in [("before", before), ("after", after)]:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            build()
+        print(f"{label:<8} {(time.perf_counter() - started) / repeat * 1000:8.3f}ms per page to build the response")
+
+
+async def main(args):
+    database = use_database(args.mongo)
+    from app.main import app
+
+    await seed(database, args.doctors, args.appointments)
+    print(f"{args.requests} requests, {args.concurrency} in flight, page size {args.page_size}, "
+          f"{'mongod' if args.mongo else 'mongomock'}")
+    for label, target in [("before", legacy_app(database)), ("after", app)]:
+        latencies, elapsed = await run(target, args.requests, args.concurrency, args.page_size)
+        p50, p95 = (statistics.quantiles(latencies, n=100)[i] for i in (49, 94))
+        print(f"{label:<8} {len(latencies) / elapsed:8.1f} req/s   p50 {p50:7.2f}ms   p95 {p95:7.2f}ms")
+    await time_response_building(database, args.page_size, args.requests)
+
+    await drop(database, args.mongo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list_appointments throughput")
+    parser.add_argument("--mongo", help="MongoDB URL; defaults to mongomock")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--appointments", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
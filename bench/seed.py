@@ -0,0 +1,94 @@
+"""Shared setup for the database benchmarks: pick a database and fill it with doctors and appointments.
+
+With --mongo the benchmarks run against a real server, in a throwaway
+database that is dropped afterwards; otherwise against mongomock_motor
+(app/requirements-dev.txt), which is fine for counting round trips but not
+for absolute timings.
+"""
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BENCH_DATABASE = "medical_assistant_bench"
+SPECIALIZATIONS = ["General Dentist", "Oral Surgeon", "Pediatric Dentist"]
+STATUSES = ["scheduled", "completed", "cancelled"]
+
+
+def use_database(mongo_url=None):
+    """Point app.database at the benchmark database; call before importing any other app module"""
+    os.environ["DATABASE_HOST"] = mongo_url or "mongodb://localhost:27017"
+    os.environ["DATABASE_NAME"] = BENCH_DATABASE
+    os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+
+    import app.database
+
+    if mongo_url is None:
+        from mongomock_motor import AsyncMongoMockClient
+
+        app.database._client = AsyncMongoMockClient()
+    return app.database
+
+
+async def seed(database, doctors: int, appointments: int):
+    from app.services.schedule_index import minute_fields
+
+    rng = random.Random(7)
+    now = datetime.now()
+    await database.doctors_collection.delete_many({})
+    await database.appointments_collection.delete_many({})
+
+    doctor_docs = [
+        {
+            "name": f"Dr. Doctor {i}",
+            "email": f"doctor{i}@example.com",
+            "phone": f"+20100{i:07d}",
+            "specialization": SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+            "qualifications": ["BDS"],
+            "years_of_experience": 1 + i % 30,
+            "bio": "Benchmark doctor " * 20,
+            "availability": [
+                {"day_of_week": day, "time_slots": [{"start_time": "09:00:00", "end_time": "17:00:00"}]}
+                for day in range(5)
+            ],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(doctors)
+    ]
+    doctor_ids = (await database.doctors_collection.insert_many(doctor_docs)).inserted_ids
+
+    first_day = date.today()
+    batch = []
+    for i in range(appointments):
+        start = 9 * 60 + rng.randrange(16) * 30
+        start_time, end_time = f"{start // 60:02d}:{start % 60:02d}:00", f"{(start + 30) // 60:02d}:{(start + 30) % 60:02d}:00"
+        batch.append({
+            "doctor_id": rng.choice(doctor_ids),
+            "patient_name": f"Patient {i}",
+            "patient_email": f"patient{i}@example.com",
+            "patient_phone": f"+20111{i:07d}",
+            "appointment_date": (first_day + timedelta(days=i % 60)).isoformat(),
+            "start_time": start_time,
+            "end_time": end_time,
+            **minute_fields(start_time, end_time),
+            "reason": "Routine check-up and cleaning",
+            "status": rng.choice(STATUSES),
+            "notes": "Benchmark notes " * 10,
+            "created_at": now,
+            "updated_at": now,
+        })
+        if len(batch) == 1000:
+            await database.appointments_collection.insert_many(batch)
+            batch = []
+    if batch:
+        await database.appointments_collection.insert_many(batch)
+
+
+async def drop(database, mongo_url=None):
+    if mongo_url is not None:
+        await database.get_client().drop_database(BENCH_DATABASE)
+    database.close_client()
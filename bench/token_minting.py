@@ -0,0 +1,126 @@
+"""Token minting latency: one httpx client per request vs the pooled client.
+
+Starts a local stub of POST /v1/realtime/sessions and mints --requests tokens
+with --concurrency in flight, once the old way (a new AsyncClient, so a new
+connection, per call) and once through create_openai_session on the shared
+pooled client. The stub answers 429 for --fail-rate of requests to exercise
+the retry path. Plain HTTP, so the saved handshake is TCP only; against the
+real API the TLS handshake is saved as well.
+
+    python bench/token_minting.py --requests 500 --concurrency 20 --latency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port: int, latency_ms: float, fail_rate: float) -> set:
+    """Serve the stub in a background thread; returns the set of client ports seen (one per connection)"""
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    connections = set()
+
+    async def sessions(request):
+        connections.add(request.client.port)
+        await asyncio.sleep(latency_ms / 1000)
+        if random.random() < fail_rate:
+            return JSONResponse({"error": {"message": "Rate limit reached"}}, status_code=429)
+        body = await request.json()
+        return JSONResponse({
+            "id": f"sess_{random.getrandbits(48):012x}",
+            "model": body["model"],
+            "voice": body["voice"],
+            "client_secret": {"value": f"ek_{random.getrandbits(64):016x}", "expires_at": int(time.time()) + 60},
+        })
+
+    app = Starlette(routes=[Route("/v1/realtime/sessions", sessions, methods=["POST"])])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return connections
+
+
+async def run(mint, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await mint()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def report(label: str, latencies, elapsed: float, connections: int):
+    p50, p95 = (statistics.quantiles(latencies, n=100)[i] for i in (49, 94))
+    print(f"{label:<22} {len(latencies) / elapsed:8.1f} req/s   p50 {p50:7.2f}ms   p95 {p95:7.2f}ms   "
+          f"connections {connections}")
+
+
+async def main(args):
+    port = free_port()
+    # Read by app.config at import
+    os.environ["OPENAI_API_BASE"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["OPENAI_API_KEY"] = "bench-key"
+    os.environ["OPENAI_HTTP_RETRY_BACKOFF"] = "0.01"
+    connections = start_stub(port, args.latency, args.fail_rate)
+
+    import httpx
+
+    from app.services.http_client import close_http_client, start_http_client
+    from app.services.openai_service import create_openai_session
+
+    url = f"{os.environ['OPENAI_API_BASE']}/realtime/sessions"
+    payload = {"model": "gpt-4o-realtime-preview", "voice": "alloy"}
+
+    async def mint_per_request():
+        # The old path: new client, new connection, no retries
+        async with httpx.AsyncClient() as client:
+            await client.post(url, json=payload, headers={"Authorization": "Bearer bench-key"})
+
+    print(f"{args.requests} tokens, {args.concurrency} in flight, stub latency {args.latency}ms, "
+          f"429 rate {args.fail_rate:.0%}")
+    latencies, elapsed = await run(mint_per_request, args.requests, args.concurrency)
+    report("client per request", latencies, elapsed, len(connections))
+
+    connections.clear()
+    await start_http_client()
+    try:
+        latencies, elapsed = await run(
+            lambda: create_openai_session(payload["model"], payload["voice"]), args.requests, args.concurrency
+        )
+    finally:
+        await close_http_client()
+    report("pooled client", latencies, elapsed, len(connections))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark session token minting against a local stub server")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=20, help="stub response time in ms")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of stub responses that are 429")
+    asyncio.run(main(parser.parse_args()))
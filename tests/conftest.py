@@ -0,0 +1,62 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# app.config reads these at import; tests never talk to OpenAI or a real deployment
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("DATABASE_HOST", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "medical_assistant_test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# A real server for the tests that need one (query plans, true concurrency); mongomock otherwise
+TEST_MONGO_URL = os.getenv("TEST_MONGO_URL")
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Motor client behind app.database's lazy collections: TEST_MONGO_URL if set, else in-memory"""
+    import app.database
+    from app.services.doctor_cache import doctor_cache
+    from app.services.doctor_search import doctor_search_index
+
+    clients = {}
+    if TEST_MONGO_URL:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        def client_for_loop():
+            # Motor binds to the loop it first runs on, and tests call asyncio.run more than once
+            loop = asyncio.get_running_loop()
+            if loop not in clients:
+                clients[loop] = AsyncIOMotorClient(TEST_MONGO_URL)
+            return clients[loop]
+
+        monkeypatch.setattr(app.database, "get_client", client_for_loop)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        app.database._client = AsyncMongoMockClient()
+    doctor_cache.clear()
+    yield app.database
+
+    if TEST_MONGO_URL:
+        async def drop():
+            await app.database.get_client().drop_database(app.database.DATABASE_NAME)
+
+        asyncio.run(drop())
+        for client in clients.values():
+            client.close()
+    app.database._client = None
+    doctor_cache.clear()
+    doctor_search_index.mark_dirty()
+
+
+@pytest.fixture
+def real_mongo(mongo):
+    """For checks mongomock cannot answer, such as explain() plans"""
+    if not TEST_MONGO_URL:
+        pytest.skip("needs a real server: set TEST_MONGO_URL")
+    return mongo
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from bson import ObjectId
+
+from app.services.bulk_import import import_appointments, import_doctors, iter_lines
+from app.services.indexes import ensure_indexes
+
+DOCTOR = {
+    "name": "Dr. Import",
+    "email": "import@example.com",
+    "phone": "+201000000000",
+    "specialization": "General Dentist",
+    "years_of_experience": 3,
+}
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def lines_of(body: bytes):
+    # Split mid-line too, as a request body arrives in arbitrary chunks
+    return iter_lines(stream(body[:7], body[7:]))
+
+
+BAD_ROWS = b'[1, 2]\n"x"\n\xff\xfe{}\n{not json\n'
+
+
+def test_doctor_import_reports_bad_rows_per_line(mongo):
+    body = BAD_ROWS + b"\n" + json.dumps(DOCTOR).encode() + b"\n"
+    report = asyncio.run(import_doctors(lines_of(body)))
+
+    assert report["inserted"] == 1
+    assert report["failed"] == 4
+    assert [error["line"] for error in report["errors"]] == [1, 2, 3, 4]
+    assert report["errors"][0]["error"] == "Expected a JSON object, got list"
+    assert report["errors"][1]["error"] == "Expected a JSON object, got str"
+    assert report["errors"][2]["error"].startswith("Invalid UTF-8")
+    assert report["errors"][3]["error"].startswith("Invalid JSON")
+
+
+def test_appointment_import_rejects_non_object_rows(mongo):
+    report = asyncio.run(import_appointments(lines_of(BAD_ROWS)))
+
+    assert report["inserted"] == 0
+    assert report["failed"] == 4
+
+
+def appointment_row(doctor_id, start_time: str, end_time: str) -> dict:
+    return {
+        "doctor_id": doctor_id,
+        "patient_name": "Patient",
+        "patient_email": "patient@example.com",
+        "patient_phone": "+201000000001",
+        "appointment_date": "2030-01-07",
+        "start_time": start_time,
+        "end_time": end_time,
+        "reason": "Checkup",
+    }
+
+
+def body_of(*rows: dict) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def test_appointment_import_requires_a_valid_doctor_id(mongo):
+    rows = [appointment_row(None, "10:00", "10:30"), appointment_row("", "10:00", "10:30"), appointment_row("nope", "10:00", "10:30")]
+    del rows[0]["doctor_id"]
+    report = asyncio.run(import_appointments(lines_of(body_of(*rows))))
+
+    assert report["inserted"] == 0
+    assert [error["error"] for error in report["errors"]] == ["doctor_id: required", "doctor_id: required", "doctor_id: invalid"]
+
+
+def test_rows_that_lose_their_reservation_free_the_snapshot(mongo):
+    availability = [{"day_of_week": 0, "time_slots": [{"start_time": "09:00", "end_time": "17:00"}]}]
+
+    async def run():
+        await ensure_indexes()
+        doctor_id = (await mongo.doctors_collection.insert_one({**DOCTOR, "availability": availability})).inserted_id
+        # 10:00-10:05 claimed by a booking that landed after the snapshot was loaded
+        await mongo.reservations_collection.insert_one(
+            {"doctor_id": doctor_id, "date": "2030-01-07", "slot": 600, "appointment_id": ObjectId()}
+        )
+        body = body_of(
+            appointment_row(str(doctor_id), "10:00", "10:30"),
+            appointment_row(str(doctor_id), "10:05", "10:30"),
+        )
+        return await import_appointments(lines_of(body), chunk_size=1)
+
+    report = asyncio.run(run())
+    assert report["errors"] == [{"line": 1, "error": "This time slot is already booked"}]
+    assert report["inserted"] == 1
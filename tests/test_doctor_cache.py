@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime
+
+from app.services import doctor_cache as cache_module
+from app.services.doctor_cache import DoctorCache
+
+AVAILABILITY = [{"day_of_week": 0, "time_slots": [{"start_time": "09:00", "end_time": "17:00"}]}]
+
+
+def test_callers_cannot_mutate_cached_documents(mongo):
+    doctor_id = asyncio.run(mongo.doctors_collection.insert_one({"name": "Dr. Samir", "availability": AVAILABILITY})).inserted_id
+    cache = DoctorCache()
+
+    async def run():
+        first = await cache.get(doctor_id)
+        first["availability"][0]["time_slots"][0]["end_time"] = "10:00"
+        first["availability"].append({"day_of_week": 4, "time_slots": [{"start_time": "09:00", "end_time": "12:00"}]})
+        return first, await cache.get(doctor_id)
+
+    first, second = asyncio.run(run())
+    assert cache.hits == 1
+    assert second["availability"] == AVAILABILITY
+    # An edited copy gets its own schedule, not the cached one
+    assert cache.schedule_for(second) is cache.schedule_for(second)
+    assert cache.schedule_for(first) is not cache.schedule_for(second)
+
+
+def test_polling_uses_stored_stamps_and_survives_errors(mongo, monkeypatch):
+    monkeypatch.setattr(cache_module, "DOCTOR_CACHE_POLL_INTERVAL", 0.01)
+    invalidated = []
+
+    def flaky_invalidate(doctor_id):
+        if not invalidated:
+            invalidated.append(None)
+            raise RuntimeError("boom")
+        invalidated.append(doctor_id)
+
+    monkeypatch.setattr(cache_module, "invalidate_doctor", flaky_invalidate)
+    # Stamped by a worker whose clock is far behind this one
+    stamp = datetime(2020, 1, 1)
+    asyncio.run(mongo.doctors_collection.insert_one({"name": "Dr. Samir", "updated_at": stamp}))
+
+    async def run():
+        poller = asyncio.create_task(cache_module.run_cache_invalidator("poll"))
+        await asyncio.sleep(0.05)
+        result = await mongo.doctors_collection.insert_one({"name": "Dr. Samira", "updated_at": datetime(2020, 1, 2)})
+        for _ in range(100):
+            if len(invalidated) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        assert not poller.done()
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+        return result.inserted_id
+
+    doctor_id = asyncio.run(run())
+    # The failed pass did not advance the watermark, so the change is retried rather than lost
+    assert invalidated == [None, doctor_id]
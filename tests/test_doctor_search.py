@@ -0,0 +1,43 @@
+import asyncio
+
+from bson import ObjectId
+
+from app.services.doctor_search import DoctorSearchIndex
+
+
+def index_of(*names: str, **kwargs) -> DoctorSearchIndex:
+    index = DoctorSearchIndex(**kwargs)
+    for name in names:
+        index.upsert({"_id": ObjectId(), "name": name, "specialization": "General Dentist"})
+    return index
+
+
+def test_exact_spelling_ranks_above_transliteration():
+    index = index_of("د. محمد علي", "د. محمود علي")
+
+    results = index.search_loaded("محمد")
+    assert [result["name"] for result in results] == ["د. محمد علي", "د. محمود علي"]
+    assert results[0]["score"] == 1.0
+    assert results[1]["score"] < 1.0
+
+
+def test_transliteration_still_matches_across_scripts():
+    index = index_of("Dr. Mohamed Ali")
+
+    results = index.search_loaded("محمد")
+    assert [result["name"] for result in results] == ["Dr. Mohamed Ali"]
+    assert results[0]["score"] < 1.0
+
+
+def test_search_reloads_everything_after_ttl(mongo):
+    asyncio.run(mongo.doctors_collection.insert_one({"name": "Dr. Samir", "specialization": "Oral Surgeon"}))
+    index = DoctorSearchIndex(ttl=60)
+    assert [r["name"] for r in asyncio.run(index.search("samir"))] == ["Dr. Samir"]
+
+    # Written behind the app's back, so nothing marked the index dirty
+    asyncio.run(mongo.doctors_collection.insert_one({"name": "Dr. Samira", "specialization": "Oral Surgeon"}))
+    assert [r["name"] for r in asyncio.run(index.search("samira"))] == ["Dr. Samir"]
+
+    index._loaded_at -= 60
+    assert [r["name"] for r in asyncio.run(index.search("samira"))] == ["Dr. Samira", "Dr. Samir"]
+    assert index.refreshes == 2
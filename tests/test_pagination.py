@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
+
+
+@pytest.fixture
+def client(mongo):
+    created = datetime(2030, 1, 1)
+    asyncio.run(mongo.doctors_collection.insert_many([
+        {
+            "name": name,
+            "email": f"{name.lower()}@example.com",
+            "phone": "+201000000000",
+            "specialization": "General Dentist",
+            "years_of_experience": 1,
+            "created_at": created + timedelta(days=i),
+            "updated_at": created,
+        }
+        for i, name in enumerate(["Carla", "Adam", "Basil"])
+    ]))
+    # No context manager: the lifespan (Mongo warm-up, token pool) is not needed here
+    return TestClient(app)
+
+
+def test_cursor_continues_the_same_sort(client):
+    first = client.get("/api/v1/doctors/", params={"limit": 2, "sort": "name"})
+    assert [d["name"] for d in first.json()] == ["Adam", "Basil"]
+
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    rest = client.get("/api/v1/doctors/", params={"limit": 2, "sort": "name", "cursor": cursor})
+    assert [d["name"] for d in rest.json()] == ["Carla"]
+
+
+@pytest.mark.parametrize("params", [{"sort": "created_at"}, {"sort": "name", "descending": "true"}])
+def test_cursor_from_another_sort_is_rejected(client, params):
+    cursor = client.get("/api/v1/doctors/", params={"limit": 2, "sort": "name"}).headers[NEXT_CURSOR_HEADER]
+
+    response = client.get("/api/v1/doctors/", params={"limit": 2, "cursor": cursor, **params})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Pagination cursor does not match the requested sort order"
+
+
+def test_page_headers_are_exposed_to_browsers(client):
+    response = client.get(
+        "/api/v1/doctors/", params={"limit": 2, "include_total": "true"}, headers={"Origin": "https://app.example.com"}
+    )
+    exposed = {h.strip().lower() for h in response.headers["access-control-expose-headers"].split(",")}
+    assert {NEXT_CURSOR_HEADER.lower(), TOTAL_ESTIMATE_HEADER.lower()} <= exposed
+
+
+def test_doctor_update_responds_like_get(client, mongo):
+    doctor_id = str(asyncio.run(mongo.doctors_collection.find_one({"name": "Adam"}))["_id"])
+    url = f"/api/v1/doctors/{doctor_id}"
+
+    unchanged = client.patch(url, json={})
+    assert unchanged.status_code == 200
+    assert unchanged.json() == client.get(url).json()
+
+    updated = client.patch(url, json={"years_of_experience": 5})
+    assert updated.status_code == 200
+    assert updated.json() == client.get(url).json()
+    assert updated.json()["years_of_experience"] == 5
+    assert "_id" not in updated.json() and "id" not in updated.json()
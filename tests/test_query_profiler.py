@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+
+from app.services.query_profiler import QueryProfiler, redact
+
+
+def test_redact_keeps_fields_and_operators_only():
+    shape = {"email": "patient@example.com", "$or": [{"start_minute": {"$lt": 630}}, {"_id": {"$in": [1, 2]}}]}
+    assert redact(shape) == {"email": "?", "$or": [{"start_minute": {"$lt": "?"}}, {"_id": {"$in": "?"}}]}
+    assert redact([{"$match": {"patient_phone": "+201000000000"}}, {"$limit": 5}]) == [
+        {"$match": {"patient_phone": "?"}}, {"$limit": "?"}
+    ]
+
+
+def test_slow_query_log_carries_no_filter_values(capsys):
+    profiler = QueryProfiler(slow_ms=10)
+    command = {"find": "appointments", "filter": {"patient_email": "patient@example.com", "status": {"$nin": ["cancelled"]}}}
+    profiler.started(SimpleNamespace(connection_id=("db", 27017), request_id=1, command=command))
+    profiler.succeeded(SimpleNamespace(
+        connection_id=("db", 27017), request_id=1, command_name="find", duration_micros=25_000, database_name="clinic"
+    ))
+
+    logged = capsys.readouterr().out
+    assert "[Slow Query] 25.0ms find clinic.appointments" in logged
+    assert "patient_email" in logged and "$nin" in logged
+    assert "patient@example.com" not in logged and "cancelled" not in logged
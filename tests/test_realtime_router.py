@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+from app.services.openai_service import RealtimeSession, UPSTREAM_EVENT_HANDLERS
+from app.services.telemetry import SessionTrace
+
+
+async def dispatch(session, event):
+    await UPSTREAM_EVENT_HANDLERS.get(event["type"])(session, json.dumps(event), event)
+
+
+async def upstream_frames(session):
+    frames = []
+    while len(session.to_upstream):
+        frames.append(json.loads(await session.to_upstream.get()))
+    return frames
+
+
+def make_session():
+    session = RealtimeSession(websocket=None, openai_ws=None, trace=SessionTrace("test"))
+    submitted = []
+
+    async def submit(call_id, tool_name, tool_params):
+        submitted.append(call_id)
+
+    session.tool_executor.submit = submit
+    return session, submitted
+
+
+def call_event(call_id):
+    return {"type": "response.function_call_arguments.done", "call_id": call_id, "name": "search_doctor_by_name",
+            "arguments": json.dumps({"name": "احمد"})}
+
+
+def test_response_create_waits_for_response_done_and_every_call():
+    async def main():
+        session, submitted = make_session()
+        await dispatch(session, {"type": "response.created"})
+        await dispatch(session, call_event("a"))
+        await dispatch(session, call_event("b"))
+        assert submitted == ["a", "b"]
+
+        # Result before response.done: the output goes up, response.create does not
+        await session.send_tool_output("a", {"doctors": []})
+        await dispatch(session, {"type": "response.done"})
+        frames = await upstream_frames(session)
+        assert [frame["type"] for frame in frames] == ["conversation.item.create"]
+
+        # Last pending call answered after response.done: exactly one response.create
+        await session.send_tool_output("b", {"doctors": []})
+        frames = await upstream_frames(session)
+        assert [frame["type"] for frame in frames] == ["conversation.item.create", "response.create"]
+        assert frames[0]["item"]["call_id"] == "b"
+
+    asyncio.run(main())
+
+
+def test_response_create_sent_on_response_done_when_results_came_first():
+    async def main():
+        session, _ = make_session()
+        await dispatch(session, {"type": "response.created"})
+        await dispatch(session, call_event("a"))
+        await session.send_tool_output("a", {"ok": True})
+        assert [frame["type"] for frame in await upstream_frames(session)] == ["conversation.item.create"]
+
+        await dispatch(session, {"type": "response.done"})
+        assert [frame["type"] for frame in await upstream_frames(session)] == ["response.create"]
+
+        # Nothing left to answer: later responses do not trigger another one
+        await dispatch(session, {"type": "response.created"})
+        await dispatch(session, {"type": "response.done"})
+        assert await upstream_frames(session) == []
+
+    asyncio.run(main())
+
+
+def test_tool_call_log_has_no_argument_values(capsys):
+    async def main():
+        session, submitted = make_session()
+        event = call_event("a")
+        event["arguments"] = json.dumps({"patient_name": "Mona Adel", "patient_phone": "+201234567890"})
+        await dispatch(session, event)
+        assert submitted == ["a"]
+
+    asyncio.run(main())
+    out = capsys.readouterr().out
+    assert "search_doctor_by_name (a)" in out and "patient_phone" in out
+    assert "Mona Adel" not in out and "+201234567890" not in out
@@ -0,0 +1,132 @@
+import asyncio
+from datetime import date, time
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.database import LazyCollection
+from app.services import reservations
+from app.services.availability import align_intervals, format_minutes
+from app.services.indexes import ensure_indexes
+from app.services.reservations import insert_appointment, slot_keys
+from app.services.tools import book_appointment
+
+DAY = date(2030, 1, 7).isoformat()
+
+
+def appointment(doctor_id: ObjectId, start_time: str, end_time: str) -> dict:
+    return {
+        "doctor_id": doctor_id,
+        "appointment_date": DAY,
+        "start_time": start_time,
+        "end_time": end_time,
+        "status": "scheduled",
+    }
+
+
+async def book(doctor_id: ObjectId, start_time: str, end_time: str) -> bool:
+    try:
+        await insert_appointment(appointment(doctor_id, start_time, end_time))
+        return True
+    except HTTPException:
+        return False
+
+
+def test_slot_keys_are_one_per_bucket():
+    assert slot_keys("10:00:00", "10:30:00") == [600, 605, 610, 615, 620, 625]
+    assert slot_keys("10:00:00", "10:30:00", granularity=15) == [600, 615]
+    for start, end in [("10:02:00", "10:07:00"), ("10:00:00", "10:31:00")]:
+        with pytest.raises(ValueError):
+            slot_keys(start, end)
+
+
+def test_offered_slots_align_to_buckets():
+    assert align_intervals([(602, 640), (641, 644), (650, 663)], 5) == [(605, 640), (650, 660)]
+
+
+def test_back_to_back_bookings(mongo):
+    async def run():
+        await ensure_indexes()
+        doctor_id = ObjectId()
+        assert await book(doctor_id, "10:05:00", "10:10:00")
+        assert await book(doctor_id, "10:10:00", "10:15:00")
+        assert not await book(doctor_id, "10:10:00", "10:20:00")
+        # Off-boundary times would share a bucket with a neighbour that only touches them
+        assert not await book(doctor_id, "10:22:00", "10:27:00")
+        assert await mongo.appointments_collection.count_documents({}) == 2
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def interleaved(monkeypatch):
+    """Yield to the event loop around every collection call, as a networked driver does.
+
+    mongomock_motor's coroutines complete without ever suspending, so without
+    this asyncio.gather would run each booking to completion before the next.
+    """
+    original = LazyCollection.__getattr__
+
+    def yielding(self, attr):
+        value = original(self, attr)
+        if not asyncio.iscoroutinefunction(value):
+            return value
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            result = await value(*args, **kwargs)
+            await asyncio.sleep(0)
+            return result
+
+        return call
+
+    monkeypatch.setattr(LazyCollection, "__getattr__", yielding)
+
+
+@pytest.mark.parametrize("bookers", [300])
+def test_only_one_of_many_simultaneous_bookings_wins(mongo, interleaved, monkeypatch, bookers):
+    """All bookings go through the voice tool's check-then-insert path at once; exactly one may win"""
+    reserve_attempts = []
+    original_reserve = reservations.reserve_slots
+
+    async def counting_reserve(*args, **kwargs):
+        reserve_attempts.append(args[0])
+        return await original_reserve(*args, **kwargs)
+
+    monkeypatch.setattr(reservations, "reserve_slots", counting_reserve)
+
+    async def run():
+        await ensure_indexes()
+        doctor_id = (await mongo.doctors_collection.insert_one({
+            "name": "Dr. Busy",
+            "specialization": "General Dentist",
+            "availability": [{"day_of_week": 0, "time_slots": [{"start_time": "09:00:00", "end_time": "17:00:00"}]}],
+        })).inserted_id
+
+        async def book_via_tool(i: int) -> bool:
+            # The same 30-minute slot, plus ones shifted by 10 minutes that only partly overlap it
+            start = [600, 610, 590][i % 3]
+            try:
+                await book_appointment(
+                    str(doctor_id), f"patient{i}@example.com", date.fromisoformat(DAY),
+                    time.fromisoformat(format_minutes(start)), time.fromisoformat(format_minutes(start + 30)),
+                    patient_name=f"Patient {i}",
+                )
+                return True
+            except HTTPException as e:
+                assert e.detail == "This time slot is already booked"
+                return False
+
+        results = await asyncio.gather(*(book_via_tool(i) for i in range(bookers)))
+
+        # Many bookings passed the availability check concurrently; the reservations decided
+        assert len(reserve_attempts) > 1
+        assert sum(results) == 1
+        assert await mongo.appointments_collection.count_documents({"doctor_id": doctor_id}) == 1
+        winner = await mongo.appointments_collection.find_one({"doctor_id": doctor_id})
+        reserved = await mongo.reservations_collection.count_documents({"doctor_id": doctor_id})
+        assert reserved == (winner["end_minute"] - winner["start_minute"]) // 5
+        assert await mongo.reservations_collection.count_documents({"appointment_id": {"$ne": winner["_id"]}}) == 0
+
+    asyncio.run(run())
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+from app.services import doctor_cache, shared_state
+from app.services.rate_limits import _trusted_networks, client_key
+from app.services.session_registry import SessionRegistry
+from app.services.shared_state import MemoryStore, RateLimiter, RedisStore, SharedStore
+from app.services.token_pool import SessionTokenPool
+
+
+@pytest.fixture(params=["memory", "redis"])
+def worker_store(request, monkeypatch):
+    """Factory for one worker's view of the shared store; every call is another worker"""
+    if request.param == "memory":
+        store = MemoryStore()
+        return lambda: store
+
+    server = fakeredis.FakeServer()
+    fake_redis = SimpleNamespace(
+        from_url=lambda url, decode_responses: fakeredis.aioredis.FakeRedis(server=server, decode_responses=decode_responses)
+    )
+    monkeypatch.setattr(shared_state, "redis_asyncio", fake_redis)
+    return lambda: RedisStore("redis://fake")
+
+
+def test_shared_store_is_abstract():
+    with pytest.raises(TypeError):
+        SharedStore()
+
+
+def test_token_pool_lease_lets_one_worker_refill(worker_store):
+    minted = []
+
+    async def mint(model, voice, instructions):
+        minted.append(model)
+        await asyncio.sleep(0)
+        return {"client_secret": {"value": "token", "expires_at": time.time() + 60}}
+
+    async def run():
+        pools = [SessionTokenPool(mint, size=3, min_ttl=5, refill_interval=30, store=worker_store()) for _ in range(2)]
+        for pool in pools:
+            pool.warm("gpt-realtime", "alloy")
+        await asyncio.gather(*(task for pool in pools for task in list(pool._refilling.values())))
+
+        assert len(minted) == 3
+        assert [await pool.stats() for pool in pools] == [{"keys": 1, "tokens": 3}] * 2
+        # A token minted by one worker is handed out by the other
+        assert (await pools[1]._pop_fresh(next(iter(pools[1]._params))))["client_secret"]["value"] == "token"
+        assert await pools[0].stats() == {"keys": 1, "tokens": 2}
+        for pool in pools:
+            await pool.stop()
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_counts_across_workers(worker_store):
+    async def run():
+        limiters = [RateLimiter("sessions", 2, 60, worker_store()) for _ in range(2)]
+        assert await limiters[0].allow("10.0.0.1")
+        assert await limiters[1].allow("10.0.0.1")
+        assert not await limiters[0].allow("10.0.0.1")
+        assert await limiters[1].allow("10.0.0.2")
+
+    asyncio.run(run())
+
+
+def test_pubsub_invalidation_reaches_other_workers(worker_store, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(doctor_cache, "_invalidate_local", invalidated.append)
+    monkeypatch.setattr(doctor_cache, "DOCTOR_CACHE_INVALIDATOR", "pubsub")
+
+    async def run():
+        listener_store, other_worker = worker_store(), worker_store()
+        monkeypatch.setattr(doctor_cache, "shared_store", listener_store)
+        listener = asyncio.create_task(doctor_cache.run_cache_invalidator("pubsub"))
+        await asyncio.sleep(0.05)
+
+        # This worker's own messages are applied locally once, not again on delivery
+        doctor_cache.invalidate_doctor("65f000000000000000000001")
+        await other_worker.publish(
+            doctor_cache.INVALIDATION_CHANNEL, json.dumps({"worker": "other", "doctor_id": "65f000000000000000000002"})
+        )
+        for _ in range(50):
+            if len(invalidated) == 2:
+                break
+            await asyncio.sleep(0.01)
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    asyncio.run(run())
+    assert invalidated == ["65f000000000000000000001", "65f000000000000000000002"]
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.closed_with = None
+
+    async def close(self, code: int, reason: str = ""):
+        self.closed_with = code
+
+
+def test_drain_waits_for_sessions_to_end():
+    async def run():
+        registry = SessionRegistry()
+        websocket = FakeWebSocket()
+        assert registry.add(websocket)
+
+        drain = asyncio.create_task(registry.drain(timeout=5))
+        await asyncio.sleep(0.01)
+        assert not registry.add(FakeWebSocket())
+        registry.discard(websocket)
+        await asyncio.wait_for(drain, 1)
+        assert websocket.closed_with is None
+
+    asyncio.run(run())
+
+
+def test_drain_closes_sessions_left_after_timeout():
+    async def run():
+        registry = SessionRegistry()
+        websocket = FakeWebSocket()
+        registry.add(websocket)
+        await registry.drain(timeout=0.01)
+        assert websocket.closed_with == 1001
+
+    asyncio.run(run())
+
+
+def connection(peer: str, forwarded: str = None):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers)
+
+
+def test_client_key_ignores_forwarded_for_from_untrusted_peers():
+    assert not _trusted_networks
+    assert client_key(connection("203.0.113.7", "1.2.3.4")) == "203.0.113.7"
+
+
+def test_client_key_walks_forwarded_for_behind_trusted_proxies():
+    import ipaddress
+
+    trusted = [ipaddress.ip_network("10.0.0.0/8")]
+    # The left hops are whatever the client sent; the rightmost untrusted hop is what the proxy saw
+    request = connection("10.0.0.2", "1.2.3.4, 198.51.100.9, 10.0.0.1")
+    assert client_key(request, trusted) == "198.51.100.9"
+    assert client_key(connection("10.0.0.2"), trusted) == "10.0.0.2"
@@ -0,0 +1,65 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import telemetry
+from app.services.telemetry import SessionTrace
+
+
+class Recorder:
+    def __init__(self):
+        self.values = []
+
+    def observe(self, value):
+        self.values.append(round(value, 3))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=100.0)
+    monkeypatch.setattr(telemetry, "time", SimpleNamespace(monotonic=lambda: now.value, time=time.time))
+    return now
+
+
+@pytest.fixture
+def first_audio(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(telemetry, "FIRST_AUDIO_SECONDS", recorder)
+    return recorder
+
+
+def test_first_audio_is_timed_from_the_end_of_speech(clock, first_audio):
+    trace = SessionTrace("test")
+    trace.speech_started()
+    clock.value = 101.0
+    trace.speech_ended()  # speech_stopped
+    clock.value = 101.2
+    trace.speech_ended()  # committed
+    trace.response_created()
+    clock.value = 101.7
+    trace.audio_delta()
+    trace.audio_delta()
+
+    # A response after a tool result has no new speech to time from
+    trace.response_created()
+    clock.value = 103.0
+    trace.audio_delta()
+    trace.close()
+
+    assert first_audio.values == [0.7]
+
+
+def test_speech_without_a_response_does_not_anchor_the_next_turn(clock, first_audio):
+    trace = SessionTrace("test")
+    trace.speech_ended()
+    clock.value = 110.0
+    trace.speech_started()
+    clock.value = 112.0
+    trace.speech_ended()
+    trace.response_created()
+    clock.value = 112.5
+    trace.audio_delta()
+    trace.close()
+
+    assert first_audio.values == [0.5]
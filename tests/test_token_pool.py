@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.shared_state import MemoryStore
+from app.services.token_pool import SessionTokenPool
+
+
+async def mint_ok(model, voice, instructions):
+    return {"client_secret": {"value": "token", "expires_at": time.time() + 60}}
+
+
+async def mint_fails(model, voice, instructions):
+    raise RuntimeError("invalid voice")
+
+
+def make_pool(mint, **kwargs) -> SessionTokenPool:
+    kwargs.setdefault("refill_interval", 30)
+    return SessionTokenPool(mint, size=2, min_ttl=5, store=MemoryStore(), **kwargs)
+
+
+async def settle(pool: SessionTokenPool):
+    await asyncio.gather(*list(pool._refilling.values()))
+
+
+def test_failed_on_demand_mint_does_not_warm_the_key():
+    async def run():
+        pool = make_pool(mint_fails)
+        with pytest.raises(RuntimeError):
+            await pool.acquire("gpt-realtime", "nope")
+        assert await pool.stats() == {"keys": 0, "tokens": 0}
+        assert not pool._refilling
+
+    asyncio.run(run())
+
+
+def test_key_is_dropped_when_a_refill_mints_nothing():
+    calls = []
+
+    async def mint(model, voice, instructions):
+        calls.append(voice)
+        if len(calls) > 1:
+            raise RuntimeError("quota exceeded")
+        return await mint_ok(model, voice, instructions)
+
+    async def run():
+        pool = make_pool(mint)
+        await pool.acquire("gpt-realtime", "alloy")
+        await settle(pool)
+        assert await pool.stats() == {"keys": 0, "tokens": 0}
+
+    asyncio.run(run())
+
+
+def test_idle_keys_stop_being_refilled():
+    async def run():
+        pool = make_pool(mint_ok, refill_interval=0.01, idle_timeout=0.05)
+        pool.warm("gpt-realtime", "alloy")
+        await settle(pool)
+        pool.start()
+        await asyncio.sleep(0.02)
+        assert (await pool.stats())["keys"] == 1
+
+        await asyncio.sleep(0.1)
+        assert (await pool.stats())["keys"] == 0
+        # Coming back mints on demand and warms the key again
+        assert (await pool.acquire("gpt-realtime", "alloy"))["client_secret"]["value"] == "token"
+        assert (await pool.stats())["keys"] == 1
+        await pool.stop()
+
+    asyncio.run(run())
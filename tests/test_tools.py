@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from app.services.tools import Tool, ToolArgumentError
+
+
+async def echo(name: str):
+    return {"name": name}
+
+
+def make_tool() -> Tool:
+    return Tool("echo", "Echo a name", {"name": {"type": "string"}}, ["name"], echo)
+
+
+def test_bad_arguments_count_as_a_failed_call():
+    tool = make_tool()
+    with pytest.raises(ToolArgumentError):
+        asyncio.run(tool({}))
+    with pytest.raises(ToolArgumentError):
+        asyncio.run(tool({"name": 42}))
+    assert asyncio.run(tool({"name": "Ahmed"})) == {"name": "Ahmed"}
+
+    stats = tool.stats.as_dict()
+    assert (stats["calls"], stats["errors"], stats["cancelled"]) == (3, 2, 0)
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import date, time
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.endpoints.appoinments_routes import check_doctor_availability
+from app.services import availability
+from app.services.bulk_import import ScheduleSnapshot
+from app.services.schedule_index import minute_fields
+from app.utils.migrate_times import migrate
+
+DAY = date(2030, 1, 7)  # a Monday
+WORKING_HOURS = [{"day_of_week": 0, "time_slots": [{"start_time": "09:00:00", "end_time": "17:00:00"}]}]
+
+
+@pytest.fixture
+def doctor_id(mongo):
+    doctor_id = ObjectId()
+
+    async def seed():
+        await mongo.doctors_collection.insert_one(
+            {"_id": doctor_id, "name": "Dr. Test", "specialization": "General Dentist", "availability": WORKING_HOURS}
+        )
+        # Written before the integer-minute fields existed
+        await mongo.appointments_collection.insert_one({
+            "doctor_id": doctor_id,
+            "appointment_date": DAY.isoformat(),
+            "start_time": "10:00:00",
+            "end_time": "10:30:00",
+            "status": "scheduled",
+        })
+
+    asyncio.run(seed())
+    return doctor_id
+
+
+def assert_blocks_overlap_only(doctor_id):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(check_doctor_availability(str(doctor_id), DAY, time(10, 15), time(10, 45)))
+    assert error.value.detail == "This time slot is already booked"
+
+    assert asyncio.run(check_doctor_availability(str(doctor_id), DAY, time(10, 30), time(11, 0)))
+
+
+def test_overlap_filter_is_a_single_range_predicate():
+    assert availability.overlap_filter(600, 630) == {"start_minute": {"$lt": 630}, "end_minute": {"$gt": 600}}
+
+
+def test_overlap_check_sees_appointments_after_migration(doctor_id, mongo):
+    assert asyncio.run(migrate(dry_run=True)) == 1
+    # migrate()'s bulk_write trips mongomock; apply the same $set it would
+    asyncio.run(mongo.appointments_collection.update_many(
+        {"start_minute": {"$exists": False}}, {"$set": minute_fields("10:00:00", "10:30:00")}
+    ))
+    assert asyncio.run(migrate(dry_run=True)) == 0
+    assert_blocks_overlap_only(doctor_id)
+
+
+def test_legacy_flag_matches_unmigrated_appointments(doctor_id, monkeypatch):
+    monkeypatch.setattr(availability, "LEGACY_TIME_FIELDS", True)
+    assert_blocks_overlap_only(doctor_id)
+
+
+def test_schedule_snapshot_loads_unmigrated_appointments(doctor_id):
+    def row(start: int, end: int) -> dict:
+        return {
+            "doctor_id": doctor_id,
+            "appointment_date": DAY.isoformat(),
+            "start_minute": start,
+            "end_minute": end,
+            "status": "scheduled",
+        }
+
+    snapshot = ScheduleSnapshot()
+    rows = [row(615, 645), row(630, 660)]
+    asyncio.run(snapshot.load(rows))
+
+    assert snapshot.booked[(doctor_id, DAY.isoformat())] == [(600, 630)]
+    assert snapshot.check(rows[0]) == "This time slot is already booked"
+    assert snapshot.check(rows[1]) is None